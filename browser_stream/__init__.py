@@ -83,6 +83,14 @@ class MediaResult:
 _batch_settings_cache: BatchProcessingSettings | None = None
 
 
+def _ask(message: str, assume_yes: bool = False) -> bool:
+    """Confirm with the user unless ``assume_yes`` is set (``--yes``)"""
+    if assume_yes:
+        echo.debug(f"Assuming yes: {message}")
+        return True
+    return utils.confirm(message)
+
+
 def resolve_stream(
     info: FfmpegMediaInfo,
     kind: tp.Literal["audio", "subtitle"],
@@ -188,7 +196,9 @@ def build_stream_url_plex(
     assert conf.plex_x_token is not None
     assert conf.host_url is not None
     plex = PlexAPI(conf.plex_x_token, conf.host_url, server_id=conf.plex_server_id)
-    return utils.url_encode(plex.get_stream_url(media_file))
+    with plex:
+        # get_direct_url already query-encodes the token, quoting again doubles it
+        return plex.get_stream_url(media_file)
 
 
 def is_tv_show_directory(directory: Path) -> bool:
@@ -299,6 +309,7 @@ def select_audio(
     audio_file: Path | None = None,
     audio_lang: str | None = None,
     scan_directory: bool = True,
+    assume_yes: bool = False,
 ) -> tuple[Path | FfmpegStream, str]:
     global _batch_settings_cache
     ffmpeg = Ffmpeg()
@@ -320,12 +331,14 @@ def select_audio(
 
         if audio.codec != config.BROWSER_AUDIO_CODEC:
             audio_file_aac = get_aac_audio_path(audio_file, audio_lang)
-            if audio_file_aac.exists() and utils.confirm(
-                f"{config.BROWSER_AUDIO_CODEC.upper()} audio file already exists: {audio_file_aac}. Do you want to use it (n – overwrite)?"
+            if audio_file_aac.exists() and _ask(
+                f"{config.BROWSER_AUDIO_CODEC.upper()} audio file already exists: {audio_file_aac}. Do you want to use it (n – overwrite)?",
+                assume_yes=assume_yes,
             ):
                 return audio_file_aac, audio_lang
-            if utils.confirm(
-                f"Audio codec is not {config.BROWSER_AUDIO_CODEC.upper()}: {audio.codec} (supported in browsers). Do you want to convert it?"
+            if _ask(
+                f"Audio codec is not {config.BROWSER_AUDIO_CODEC.upper()}: {audio.codec} (supported in browsers). Do you want to convert it?",
+                assume_yes=assume_yes,
             ):
                 audio_file = ffmpeg.convert_audio(
                     audio_file, output_file=audio_file_aac, audio_lang=audio_lang
@@ -396,8 +409,9 @@ def select_audio(
             audio_media_stream_selected
         )
         audio_aac = get_aac_audio_path(media_file, audio_lang)
-        if audio_aac.exists() and utils.confirm(
-            f"{config.BROWSER_AUDIO_CODEC.upper()} audio file already exists: {audio_aac.name}. Do you want to use it?"
+        if audio_aac.exists() and _ask(
+            f"{config.BROWSER_AUDIO_CODEC.upper()} audio file already exists: {audio_aac.name}. Do you want to use it?",
+            assume_yes=assume_yes,
         ):
             return audio_aac, audio_lang
 
@@ -416,8 +430,9 @@ def select_audio(
                 else:
                     echo.info("Using cached decision: not converting audio")
             else:
-                convert_audio = utils.confirm(
-                    f"Audio codec is not {config.BROWSER_AUDIO_CODEC.upper()}: {audio_media_stream_selected.codec}. Do you want to convert it?"
+                convert_audio = _ask(
+                    f"Audio codec is not {config.BROWSER_AUDIO_CODEC.upper()}: {audio_media_stream_selected.codec}. Do you want to convert it?",
+                    assume_yes=assume_yes,
                 )
                 # Cache the decision
                 if _batch_settings_cache is not None:
@@ -440,16 +455,15 @@ def select_audio(
             audio_external_stream_selected
         )
         audio_aac = get_aac_audio_path(external_audio_file, audio_lang)
-        if audio_aac.exists() and utils.confirm(
-            f"{config.BROWSER_AUDIO_CODEC.upper()} audio file already exists: {audio_aac.name}. Do you want to use it?"
+        if audio_aac.exists() and _ask(
+            f"{config.BROWSER_AUDIO_CODEC.upper()} audio file already exists: {audio_aac.name}. Do you want to use it?",
+            assume_yes=assume_yes,
         ):
             return audio_aac, audio_lang
 
-        if (
-            audio_external_stream_selected.codec != config.BROWSER_AUDIO_CODEC
-            and utils.confirm(
-                f"Audio codec is not {config.BROWSER_AUDIO_CODEC.upper()}: {audio_external_stream_selected.codec}. Do you want to convert it?"
-            )
+        if audio_external_stream_selected.codec != config.BROWSER_AUDIO_CODEC and _ask(
+            f"Audio codec is not {config.BROWSER_AUDIO_CODEC.upper()}: {audio_external_stream_selected.codec}. Do you want to convert it?",
+            assume_yes=assume_yes,
         ):
             return ffmpeg.convert_audio(
                 external_audio_file,
@@ -466,6 +480,8 @@ def select_subtitle(
     subtitle_file: Path | None = None,
     subtitle_lang: str | None = None,
     scan_directory: bool = True,
+    assume_yes: bool = False,
+    webvtt: bool = False,
 ) -> tuple[Path | None, str | None]:
     global _batch_settings_cache
     ffmpeg = Ffmpeg()
@@ -541,7 +557,10 @@ def select_subtitle(
             else:
                 echo.info("Using cached decision: not selecting subtitles")
         else:
-            select_subs = utils.confirm("Select subtitles?")
+            # --yes with --subtitle-lang already says which subtitles are wanted
+            select_subs = _ask(
+                "Select subtitles?", assume_yes=assume_yes and subtitle_lang is not None
+            )
             # Cache the decision
             if _batch_settings_cache is not None:
                 _batch_settings_cache.select_subtitles = select_subs
@@ -591,6 +610,8 @@ def select_subtitle(
                 media_file,
                 media_stream_subtitle,
                 subtitle_lang=subtitle_lang,
+                webvtt=webvtt,
+                assume_yes=assume_yes,
             )
             return subtitle_file, subtitle_lang
         raise RuntimeError("Should not reach this point")
@@ -655,7 +676,9 @@ def get_matched_media_stream_mp4(
     return None
 
 
-def setup_batch_processing(media_path: Path) -> BatchProcessingInfo | None:
+def setup_batch_processing(
+    media_path: Path, assume_yes: bool = False
+) -> BatchProcessingInfo | None:
     """Handle TV show batch processing setup - returns BatchProcessingInfo if user wants batch processing"""
     fs = FS()
     video_files = sorted(fs.get_video_files(media_path, recursive_depth=0))
@@ -670,7 +693,10 @@ def setup_batch_processing(media_path: Path) -> BatchProcessingInfo | None:
     echo.info(f"Detected TV show directory with {len(video_files)} episodes")
 
     # Ask if user wants batch processing first
-    if not utils.confirm("Do you want to batch process episodes from a starting point?"):
+    if not _ask(
+        "Do you want to batch process episodes from a starting point?",
+        assume_yes=assume_yes,
+    ):
         return None
 
     # Filter out processed files (stream variants) and group by format
@@ -739,6 +765,7 @@ def batch_prepare_episodes(
     subtitle_lang: str | None = None,
     burn_subtitles: bool = False,
     add_subtitles_to_mp4: bool = False,
+    assume_yes: bool = False,
 ) -> None:
     """Batch process TV show episodes with settings from first episode"""
     global _batch_settings_cache
@@ -758,6 +785,7 @@ def batch_prepare_episodes(
         burn_subtitles=burn_subtitles,
         add_subtitles_to_mp4=add_subtitles_to_mp4,
         no_scan=True,  # Don't scan for first episode since it's batch mode
+        assume_yes=assume_yes,
     )
 
     echo.info(f"✅ First episode prepared: {first_stream_media.path}")
@@ -771,8 +799,9 @@ def batch_prepare_episodes(
         return
 
     # Ask user confirmation for batch processing
-    if not utils.confirm(
-        f"Apply the same settings to {len(remaining_episodes)} remaining episodes?"
+    if not _ask(
+        f"Apply the same settings to {len(remaining_episodes)} remaining episodes?",
+        assume_yes=assume_yes,
     ):
         echo.info("Batch processing cancelled.")
         _batch_settings_cache = None  # Clear cache
@@ -796,6 +825,7 @@ def batch_prepare_episodes(
                 burn_subtitles=burn_subtitles,
                 add_subtitles_to_mp4=add_subtitles_to_mp4,
                 no_scan=True,  # Don't scan directory for each episode
+                assume_yes=assume_yes,
             )
             echo.info(f"✅ Episode prepared: {episode_stream_media.path}")
         except Exception as e:
@@ -1181,20 +1211,22 @@ def repack_media_files(
             continue
 
         try:
+            # Subtitles are extracted by the repack run itself (single read)
+            sub_stream = None
+            if sub_idx or subtitle_langs:
+                sub_stream = ffmpeg.find_subtitle_stream(
+                    ffmpeg.get_media_info(input_file),
+                    subtitle_indices=sub_idx or None,
+                    subtitle_langs=subtitle_langs or None,
+                )
             ffmpeg.repack_to_mp4(
                 input_file=input_file,
                 output_file=output_file,
                 audio_langs=audio_langs,
                 audio_indices=audio_idx,
+                subtitle_stream=sub_stream,
+                subtitle_output=output_file.with_suffix(".srt") if sub_stream else None,
             )
-            if sub_idx or subtitle_langs:
-                srt_output = output_file.with_suffix(".srt")
-                ffmpeg.extract_subs_to_file(
-                    input_file=input_file,
-                    output_srt=srt_output,
-                    subtitle_indices=sub_idx or None,
-                    subtitle_langs=subtitle_langs or None,
-                )
             output_size = output_file.stat().st_size
             results.append(
                 RepackResult(
@@ -1227,6 +1259,7 @@ def prepare_file_to_stream(
     burn_subtitles: bool = False,
     add_subtitles_to_mp4: bool = False,
     no_scan: bool = False,
+    assume_yes: bool = False,
 ) -> StreamMedia:
     global _batch_settings_cache
     fs = FS()
@@ -1247,6 +1280,7 @@ def prepare_file_to_stream(
         audio_file=audio_file,
         audio_lang=audio_lang,
         scan_directory=should_scan_directory,
+        assume_yes=assume_yes,
     )
     echo.info(f"Selected audio: {selected_audio} [{audio_lang}]")
     subtitle_file, subtitle_lang = select_subtitle(
@@ -1254,6 +1288,9 @@ def prepare_file_to_stream(
         subtitle_file=subtitle_file,
         subtitle_lang=subtitle_lang,
         scan_directory=should_scan_directory,
+        assume_yes=assume_yes,
+        # A WebVTT copy is only useful when subtitles are served next to the video
+        webvtt=not burn_subtitles and not add_subtitles_to_mp4,
     )
     if subtitle_file:
         subtitle_file = fs.enforce_utf8(subtitle_file)
@@ -1290,8 +1327,9 @@ def prepare_file_to_stream(
     if matched_media:
         echo.info(f"Found matched media file: {matched_media.name}")
         media_file = matched_media
-    elif not output_file.exists() or utils.confirm(
-        f"File already exists: {output_file.name}, do you want to overwrite it?"
+    elif not output_file.exists() or _ask(
+        f"File already exists: {output_file.name}, do you want to overwrite it?",
+        assume_yes=assume_yes,
     ):
         media_file = ffmpeg.convert_to_mp4(
             media_file,
@@ -1313,8 +1351,9 @@ def prepare_file_to_stream(
 
     if subtitle_file and not burn_subtitles and fs.get_extension(subtitle_file) != "vtt":
         vtt_subtitle_file = subtitle_file.with_suffix(".vtt")
-        if vtt_subtitle_file.exists() and utils.confirm(
-            f"VTT subtitle file already exists: {vtt_subtitle_file.name}. Do you want to use it?"
+        if vtt_subtitle_file.exists() and _ask(
+            f"VTT subtitle file already exists: {vtt_subtitle_file.name}. Do you want to use it?",
+            assume_yes=assume_yes,
         ):
             echo.info(
                 f"VTT subtitle file already exists: {vtt_subtitle_file}. Using it for streaming"
@@ -1332,8 +1371,9 @@ def prepare_file_to_stream(
                 else:
                     echo.info("Using cached decision: not converting subtitle to VTT")
             else:
-                convert_to_vtt = utils.confirm(
-                    f"Subtitle file is not in VTT format: {subtitle_file.name} (supported in HTML5). Do you want to convert it?"
+                convert_to_vtt = _ask(
+                    f"Subtitle file is not in VTT format: {subtitle_file.name} (supported in HTML5). Do you want to convert it?",
+                    assume_yes=assume_yes,
                 )
                 # Cache the decision
                 if _batch_settings_cache is not None:
@@ -1362,6 +1402,8 @@ def stream_nginx(
     add_subtitles_to_mp4: bool = False,
     do_not_convert: bool = False,
     no_scan: bool = False,
+    assume_yes: bool = False,
+    inline_subtitles: bool = False,
 ):
     """
     Check Nginx configuration, convert file and prints the URL to stream media file
@@ -1403,6 +1445,7 @@ def stream_nginx(
             burn_subtitles=burn_subtitles,
             add_subtitles_to_mp4=add_subtitles_to_mp4,
             no_scan=no_scan,
+            assume_yes=assume_yes,
         )
         media = stream_media.path
         subtitle_file = stream_media.subtitle_path
@@ -1413,11 +1456,20 @@ def stream_nginx(
         echo.info(
             f"Create HTML file with video and subtitles: {media.with_suffix('.html')}"
         )
-        html_data = html.get_video_html_with_subtitles(
-            video_url=build_stream_url_nginx(media),
-            subtitles_url=build_stream_url_nginx(subtitle_file),
-            language=subtitle_lang or "Unknown",
-        )
+        if inline_subtitles:
+            if fs.get_extension(subtitle_file) != "vtt":
+                raise Exit(f"Inline subtitles must be in VTT format: {subtitle_file}")
+            html_data = html.get_video_html_with_inline_subtitles(
+                video_url=build_stream_url_nginx(media),
+                subtitle_bytes=subtitle_file.read_bytes(),
+                language=subtitle_lang or "Unknown",
+            )
+        else:
+            html_data = html.get_video_html_with_subtitles(
+                video_url=build_stream_url_nginx(media),
+                subtitles_url=build_stream_url_nginx(subtitle_file),
+                language=subtitle_lang or "Unknown",
+            )
         media = media.with_suffix(".html")
         fs.write_file(media, html_data)
 
@@ -1454,6 +1506,7 @@ def stream_plex(
     burn_subtitles: bool = False,
     do_not_convert: bool = False,
     no_scan: bool = False,
+    assume_yes: bool = False,
 ):
     """
     Check file exists on Plex server, convert file and prints the URL to stream media file
@@ -1486,16 +1539,22 @@ def stream_plex(
             burn_subtitles=burn_subtitles,
             add_subtitles_to_mp4=True,  # Always embed subtitles for Plex
             no_scan=no_scan,
+            assume_yes=assume_yes,
         )
         media = stream_media.path
         subtitle_file = stream_media.subtitle_path
         subtitle_lang = stream_media.subtitle_lang
         burn_subtitles = stream_media.subtitles_burned
 
-    # Check if media file exists on Plex server
+    # Check if media (and subtitle) files exist on Plex server, resolved together
+    paths = [media]
+    if subtitle_file and not burn_subtitles:
+        paths.append(subtitle_file)
     try:
-        plex = PlexAPI(conf.plex_x_token, conf.host_url, server_id=conf.plex_server_id)
-        stream_url = plex.get_stream_url(media)
+        with PlexAPI(
+            conf.plex_x_token, conf.host_url, server_id=conf.plex_server_id
+        ) as plex:
+            stream_url, *subtitle_urls = plex.get_stream_urls(paths)
     except Exit as e:
         echo.error(f"Failed to get Plex stream URL: {e.message}")
         echo.info(
@@ -1510,7 +1569,7 @@ def stream_plex(
         # For Plex, we need to use the direct stream URL, not build our own
         html_data = html.get_video_html_with_subtitles(
             video_url=stream_url,
-            subtitles_url=build_stream_url_plex(subtitle_file),
+            subtitles_url=subtitle_urls[0],
             language=subtitle_lang or "Unknown",
         )
         html_file = media.with_suffix(".html")
@@ -1,3 +1,4 @@
+import hashlib
 import shlex
 import sys
 import typing as tp
@@ -6,8 +7,6 @@ from pathlib import Path
 
 import click
 import typer
-from rich.console import Console
-from rich.table import Table
 
 import browser_stream.config as config
 import browser_stream.utils as utils
@@ -30,6 +29,11 @@ from browser_stream import (
 from browser_stream.echo import echo, setup_logger
 from browser_stream.utils import PromptNeeded
 
+_NGINX_SITES_AVAILABLE = Path("/etc/nginx/sites-available")
+_NGINX_SITES_ENABLED = Path("/etc/nginx/sites-enabled")
+_SERVER_CHOICE = click.Choice(("nginx", "plex"), case_sensitive=False)
+_SUBTITLE_FORMAT_CHOICE = click.Choice(("vtt", "srt", "ass", "ssa"), case_sensitive=False)
+
 app = typer.Typer(
     name="browser-streamer",
     help=f"""A CLI tool to prepare and manage media for streaming over HTTP using Nginx or Plex direct links.
@@ -110,6 +114,11 @@ def app_callback(
         "--overwrite",
         help="Overwrite existing files",
     ),
+    cache_ttl: int | None = typer.Option(
+        None,
+        "--cache-ttl",
+        help="Seconds to reuse cached Plex library responses (0 disables the cache)",
+    ),
 ):
     """Global options for all commands."""
     if json:
@@ -122,6 +131,9 @@ def app_callback(
     if overwrite:
         config.OVERWRITE_DEFAULT = overwrite
 
+    if cache_ttl is not None:
+        config.PLEX_CACHE_TTL = cache_ttl
+
     setup_logger(log_level=log_level)
 
 
@@ -187,16 +199,18 @@ def nginx_command(
     nginx = Nginx()
     nginx.exit_if_not_installed()
 
-    if conf.nginx_conf_name != site_conf_name:
-        conf.nginx_conf_name = site_conf_name
-        conf.save()
+    # Saved once on whichever path the command exits through
+    conf_name_changed = conf.nginx_conf_name != site_conf_name
+    conf.nginx_conf_name = site_conf_name
 
-    site_available = Path("/etc/nginx/sites-available") / site_conf_name
-    site_enabled = Path("/etc/nginx/sites-enabled") / site_conf_name
+    site_available = _NGINX_SITES_AVAILABLE / site_conf_name
+    site_enabled = _NGINX_SITES_ENABLED / site_conf_name
 
     if reset:
         fs.remove_file(site_available, sudo=True)
         fs.remove_file(site_enabled, sudo=True)
+        if conf_name_changed:
+            conf.save()
         echo.info("Nginx configuration reset complete")
         return
 
@@ -230,8 +244,11 @@ def nginx_command(
     )
     if (
         site_available.exists()
-        and fs.read_file(site_available).strip() == nginx_conf_data_new
+        and fs.file_digest(site_available)
+        == hashlib.sha256(f"{nginx_conf_data_new}\n".encode()).digest()
     ):
+        if conf_name_changed:
+            conf.save()
         echo.info("Nginx configuration is up-to-date")
         return
     echo.info("Generating Nginx configuration")
@@ -279,6 +296,9 @@ def media_info_command(
             result = {only.value: filtered_streams}
         echo.print_json(result)
     else:
+        from rich.console import Console
+        from rich.table import Table
+
         console = Console()
 
         # Video stream
@@ -506,7 +526,7 @@ def media_convert_subs_command(
         "vtt",
         "--to",
         help="Output format (vtt, srt, ass, ssa)",
-        click_type=click.Choice(["vtt", "srt", "ass", "ssa"], case_sensitive=False),
+        click_type=_SUBTITLE_FORMAT_CHOICE,
     ),
     output: Path | None = typer.Option(None, "-o", "--output", help="Output file path"),
 ):
@@ -850,6 +870,9 @@ def media_repack_command(
             if has_error:
                 raise Exit("One or more files failed to repack", code=1)
         else:
+            from rich.console import Console
+            from rich.table import Table
+
             console = Console()
             table = Table(title="Repack Results")
             table.add_column("Filename")
@@ -964,6 +987,13 @@ def _repack_single_file(
 
     try:
         ffmpeg = Ffmpeg()
+        srt_output = output.with_suffix(".srt")
+        # Embedded subtitles are extracted by the repack run itself (single read)
+        sub_stream = None
+        if not subtitle_file and subtitle_langs:
+            sub_stream = ffmpeg.find_subtitle_stream(
+                ffmpeg.get_media_info(media), subtitle_langs=subtitle_langs
+            )
         ffmpeg.repack_to_mp4(
             input_file=media,
             output_file=output,
@@ -972,13 +1002,14 @@ def _repack_single_file(
             audio_langs=audio_langs,
             extra_args=extra_args_list,
             audio_lang_metadata=audio_lang_metadata,
+            subtitle_stream=sub_stream,
+            subtitle_output=srt_output if sub_stream else None,
         )
         output_size = output.stat().st_size
 
         # Extract subtitles as external SRT
         srt_note = ""
         if subtitle_file:
-            srt_output = output.with_suffix(".srt")
             sub_ext = subtitle_file.suffix.lower()
             if sub_ext == ".srt":
                 utils.move_file(
@@ -991,15 +1022,11 @@ def _repack_single_file(
                     subtitle_lang=subtitle_langs[0] if subtitle_langs else None,
                 )
             srt_note = f" + {srt_output.name}"
-        elif subtitle_langs:
-            srt_output = output.with_suffix(".srt")
-            extracted = ffmpeg.extract_subs_to_file(
-                input_file=media,
-                output_srt=srt_output,
-                subtitle_langs=subtitle_langs,
-            )
-            if extracted:
-                srt_note = f" + {srt_output.name}"
+        elif (
+            sub_stream is not None
+            and sub_stream.codec not in config.BITMAP_SUBTITLE_CODECS
+        ):
+            srt_note = f" + {srt_output.name}"
 
         return MediaResult(
             command="media repack",
@@ -1030,8 +1057,8 @@ def plex_command(
 ):
     """Plex configuration"""
     path = path or utils.prompt_path("Enter path to media file")
-    plex = PlexAPI(x_token, base_url)
-    echo.print_json(plex.get_library_id_by_path(path))
+    with PlexAPI(x_token, base_url) as plex:
+        echo.print_json(plex.get_library_id_by_path(path))
 
 
 @app.command("stream")
@@ -1087,7 +1114,7 @@ def stream_command(
         "nginx",
         help="Streaming server to use (nginx or plex)",
         show_default=True,
-        click_type=click.Choice(["nginx", "plex"], case_sensitive=False),
+        click_type=_SERVER_CHOICE,
     ),
     scan_external: bool = typer.Option(
         False,
@@ -1099,6 +1126,18 @@ def stream_command(
         help="Only prepare/convert media files, don't generate streaming URLs",
         show_default=False,
     ),
+    inline_subs: bool = typer.Option(
+        False,
+        help="Embed VTT subtitles into the HTML page (Nginx only, one request less)",
+        show_default=False,
+    ),
+    yes: bool = typer.Option(
+        False,
+        "--yes",
+        "-y",
+        help="Answer yes to overwrite/convert confirmations (no blocking prompts)",
+        show_default=False,
+    ),
 ):
     """Stream media file using Nginx or Plex
 
@@ -1124,10 +1163,13 @@ def stream_command(
         $ browser-streamer stream movie.mkv --prepare-only
 
         Non-interactive mode (with --yes):
-        $ browser-streamer --yes stream media.mkv --audio-lang jpn --subtitle-lang eng
+        $ browser-streamer stream media.mkv --yes --audio-lang jpn --subtitle-lang eng
     """
-    with_nginx = server.lower() == "nginx"
-    with_plex = server.lower() == "plex"
+    server = server.lower()
+    with_nginx = server == "nginx"
+    with_plex = server == "plex"
+    if inline_subs and not with_nginx:
+        raise Exit("--inline-subs is only supported with --server=nginx", code=1)
 
     # Determine scanning behavior:
     # - Always scan if media is a directory
@@ -1147,7 +1189,7 @@ def stream_command(
             # Only prepare/convert media, don't generate streaming URLs
             # Handle batch processing for TV shows
             if media.is_dir():
-                batch_info = setup_batch_processing(media)
+                batch_info = setup_batch_processing(media, assume_yes=yes)
                 echo.debug(f"Batch processing info: {batch_info}")
 
                 if batch_info:
@@ -1159,6 +1201,7 @@ def stream_command(
                         subtitle_lang=subtitle_lang,
                         burn_subtitles=burn_subtitles,
                         add_subtitles_to_mp4=embed_subs,
+                        assume_yes=yes,
                     )
                     return
 
@@ -1172,6 +1215,7 @@ def stream_command(
                 burn_subtitles=burn_subtitles,
                 add_subtitles_to_mp4=embed_subs,
                 no_scan=not should_scan,
+                assume_yes=yes,
             )
             echo.info(f"Media prepared: {stream_media.path}")
             if stream_media.subtitle_path:
@@ -1187,6 +1231,8 @@ def stream_command(
             do_not_convert=raw,
             add_subtitles_to_mp4=embed_subs,
             no_scan=not should_scan,
+            assume_yes=yes,
+            inline_subtitles=inline_subs,
         )
     elif with_plex:
         stream_plex(
@@ -1197,6 +1243,7 @@ def stream_command(
             audio_lang=audio_lang,
             do_not_convert=raw,
             no_scan=not should_scan,
+            assume_yes=yes,
         )
     echo.info("Completed")
 
@@ -3,9 +3,14 @@ import os
 __version__ = "0.4.1"
 
 
+_TRUTHY = frozenset(("true", "1", "yes"))
+
+
 def _env_flag(name: str, default: bool = False) -> bool:
-    value = os.getenv(name, str(default)).lower()
-    return value in ["true", "1", "yes"]
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in _TRUTHY
 
 
 # Typer
@@ -27,35 +32,50 @@ BROWSER_AUDIO_CODEC = os.getenv("BROWSER_AUDIO_CODEC", "aac").lower()
 BROWSER_AUDIO_BITRATE = os.getenv("BROWSER_AUDIO_BITRATE", "192k")
 FFPEG_ENCODE_CRF = os.getenv("FFPEG_ENCODE_CRF", "20")
 FFPEG_ENCODE_PRESET = os.getenv("FFPEG_ENCODE_PRESET", "fast")
-VIDEO_EXTENSIONS = {
-    "mp4",
-    "mkv",
-    "avi",
-    "mov",
-    "webm",
-    "flv",
-    "wmv",
-    "m4v",
-    "3gp",
-    "ts",
-}
-AUDIO_EXTENSIONS = {
-    "mp3",
-    "m4a",
-    "aac",
-    "flac",
-    "wav",
-    "wma",
-    "mka",
-}
-SUBTITLE_EXTENSIONS = {"srt", "ssa", "ass", "vtt"}
-MP4_COMPATIBLE_AUDIO_CODECS = {"aac", "mp3", "ac3", "eac3", "alac", "opus"}
-MP4_COMPATIBLE_VIDEO_CODECS = {"h264", "hevc", "h265", "mpeg4", "av1", "vp9"}
+VIDEO_EXTENSIONS = frozenset(
+    {
+        "mp4",
+        "mkv",
+        "avi",
+        "mov",
+        "webm",
+        "flv",
+        "wmv",
+        "m4v",
+        "3gp",
+        "ts",
+    }
+)
+AUDIO_EXTENSIONS = frozenset(
+    {
+        "mp3",
+        "m4a",
+        "aac",
+        "flac",
+        "wav",
+        "wma",
+        "mka",
+    }
+)
+SUBTITLE_EXTENSIONS = frozenset({"srt", "ssa", "ass", "vtt"})
+MP4_COMPATIBLE_AUDIO_CODECS = frozenset({"aac", "mp3", "ac3", "eac3", "alac", "opus"})
+MP4_COMPATIBLE_VIDEO_CODECS = frozenset({"h264", "hevc", "h265", "mpeg4", "av1", "vp9"})
+BITMAP_SUBTITLE_CODECS = frozenset(
+    {"hdmv_pgs_subtitle", "dvd_subtitle", "dvb_subtitle", "xsub"}
+)
 BROWSER_VIDEO_CODEC = os.getenv("BROWSER_VIDEO_CODEC", "libx264").lower()
 FFMPEG_REPACK_EXTRA_FLAGS: list[str] = [
     f for f in os.getenv("FFMPEG_REPACK_EXTRA_FLAGS", "-movflags +faststart").split() if f
 ]
+# Probe only the container header of remote URLs (ffmpeg defaults: 5M / 5s), empty to
+# restore defaults. Local files are always probed with ffmpeg's defaults
+FFMPEG_PROBE_FLAGS: list[str] = os.getenv(
+    "FFMPEG_PROBE_FLAGS", "-probesize 1M -analyzeduration 1M"
+).split()
 FS_MAX_DIRS = int(os.getenv("FS_MAX_DIRS", "10"))
+PROBE_CACHE = _env_flag("PROBE_CACHE", default=True)
+PLEX_CACHE_TTL = int(os.getenv("PLEX_CACHE_TTL", "300"))  # seconds, 0 disables
 
 # Constants
 CONFIG_PATH = os.path.expanduser("~/.browser_stream/config.json")
+CACHE_DIR = os.path.expanduser("~/.cache/browser_stream")
@@ -5,15 +5,49 @@ import sys
 import typing as tp
 
 import typer
-from rich.console import Console
-from rich.logging import RichHandler
-from rich.theme import Theme
 
 from browser_stream import config
 
+try:
+    import orjson  # optional, `pip install browser-streamer[fast]`
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
+_LOG_THEME = {
+    "logging.level.info": "bold cyan",
+    "logging.level.warn": "bold yellow",
+    "logging.level.error": "bold red",
+    "logging.level.debug": "bold green",
+    "log.time": "bold white",
+}
+
+
+@functools.cache
+def _get_handler() -> logging.Handler:
+    """One handler per process, setup_logger only adjusts its level"""
+    # rich's console/logging stack is loaded when the logger is set up, not on import
+    from rich.console import Console
+    from rich.logging import RichHandler
+    from rich.theme import Theme
+
+    class FixedRichHandler(RichHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._log_render.level_width = 5
+
+    # stderr=True looks sys.stderr up on write, so redirection still applies
+    console = Console(stderr=True, theme=Theme(_LOG_THEME), width=150, soft_wrap=True)
+    return FixedRichHandler(
+        console=console,
+        omit_repeated_times=False,
+        show_path=config.DEBUG,
+        log_time_format="%X",
+    )
+
+
 def setup_logger(log_level: str | None = None) -> None:
     level_map = {
         "debug": logging.DEBUG,
@@ -28,53 +62,36 @@ def setup_logger(log_level: str | None = None) -> None:
     else:
         log_level_int = logging.DEBUG if config.DEBUG else logging.INFO
 
-    console = Console(
-        file=sys.stderr,
-        theme=Theme(
-            {
-                "logging.level.info": "bold cyan",
-                "logging.level.warn": "bold yellow",
-                "logging.level.error": "bold red",
-                "logging.level.debug": "bold green",
-                "log.time": "bold white",
-            }
-        ),
-        width=150,
-        soft_wrap=True,
-    )
-
-    class FixedRichHandler(RichHandler):
-        def __init__(self, *args, **kwargs):
-            super().__init__(*args, **kwargs)
-            self._log_render.level_width = 5
-
-    handler = FixedRichHandler(
-        console=console,
-        omit_repeated_times=False,
-        show_path=config.DEBUG,
-        log_time_format="%X",
-    )
-    logging.addLevelName(logging.INFO, "info")
-    logging.addLevelName(logging.ERROR, "error")
-    logging.addLevelName(logging.WARNING, "warn")
-    logging.addLevelName(logging.DEBUG, "debug")
-
+    handler = _get_handler()
     logger = logging.getLogger("browser_stream")
-    for existing in list(logger.handlers):
-        logger.removeHandler(existing)
-        existing.close()
+    if handler not in logger.handlers:
+        logging.addLevelName(logging.INFO, "info")
+        logging.addLevelName(logging.ERROR, "error")
+        logging.addLevelName(logging.WARNING, "warn")
+        logging.addLevelName(logging.DEBUG, "debug")
+        for existing in list(logger.handlers):
+            logger.removeHandler(existing)
+            existing.close()
+        logger.addHandler(handler)
     handler.setLevel(log_level_int)
-    logger.addHandler(handler)
     logger.setLevel(log_level_int)
 
 
+_CLEAR_LINE = " " * 50 + "\r"
+
+
 class Echo:
     """Small wrapper around typer.echo"""
 
+    @functools.cached_property
+    def _stderr_tty(self) -> bool:
+        return sys.stderr.isatty()
+
     def clear_line(self) -> None:
-        if config.JSON_OUTPUT:
+        # Only a terminal can overwrite the line, elsewhere it's junk in the log
+        if config.JSON_OUTPUT or not self._stderr_tty:
             return
-        print(" " * 50, end="\r", file=sys.stderr, flush=True)
+        print(_CLEAR_LINE, end="", file=sys.stderr, flush=True)
 
     def debug(self, msg: str, **kwargs: tp.Any) -> None:
         if config.DEBUG:
@@ -105,11 +122,16 @@ class Echo:
         if config.JSON_OUTPUT:
             return
         self.clear_line()
-        msg = typer.style(msg, fg=color, **kwargs)
+        if self._stderr_tty:
+            msg = typer.style(msg, fg=color, **kwargs)
         print(msg, end=end, file=sys.stderr, flush=True)
 
     def print_json(self, data: tp.Any) -> None:
-        json_str = json.dumps(data, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            option = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+            json_str = orjson.dumps(data, option=option).decode()
+        else:
+            json_str = json.dumps(data, indent=2, ensure_ascii=False)
         print(json_str, file=sys.stdout, flush=True)
 
 
@@ -125,9 +147,14 @@ def log(
     debug: bool = False,
 ) -> tp.Callable[[tp.Callable[P, T]], tp.Callable[P, T]]:
     def decorator(fn: tp.Callable[P, T]) -> tp.Callable[P, T]:
+        # DEBUG comes from the environment only, so debug spinners are settled here;
+        # JSON_OUTPUT is set later by the CLI callback and is checked per call
+        if debug and not config.DEBUG:
+            return fn
+
         @functools.wraps(fn)
         def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            if config.JSON_OUTPUT or debug and not config.DEBUG:
+            if config.JSON_OUTPUT:
                 return fn(*args, **kwargs)
             echo.printc(f"{message}...", color=color, end="\r")
             result = fn(*args, **kwargs)
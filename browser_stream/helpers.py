@@ -1,20 +1,28 @@
 #!/usr/local/bin/python
+import atexit
+import base64
 import dataclasses
 import datetime as dt
 import functools
+import hashlib
+import json
+import os
 import re
 import shutil
+import string
 import tempfile
+import time
 import typing as tp
 import urllib.parse
-from pathlib import Path
-
-import httpx
+from pathlib import Path, PurePosixPath
 
 import browser_stream.config as config
 import browser_stream.utils as utils
 from browser_stream.echo import echo
 
+if tp.TYPE_CHECKING:
+    import httpx
+
 
 class Exit(Exception):
     def __init__(self, message: str, code: int = 1) -> None:
@@ -28,9 +36,25 @@ def exit_if(condition: tp.Any, message: str, code: int = 1) -> None:
         raise Exit(message, code)
 
 
+def _arg(value: tp.Any) -> str:
+    """Command line representation of an argument (paths as posix)"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, Path):
+        return value.as_posix()
+    return str(value)
+
+
 class PlexAPI:
     """Wrapper around Plex API"""
 
+    # Library listings are only used to map files to ratingKeys, skip the bulky fields
+    _LIBRARY_PARAMS: tp.ClassVar[dict[str, str]] = {
+        "excludeFields": "summary,tagline,thumb,art,theme",
+        "excludeElements": "Genre,Country,Director,Writer,Role,Producer,Collection,Guid",
+    }
+    _SECTIONS_PATH = "/library/sections"
+
     def __init__(
         self,
         x_token: str,
@@ -40,13 +64,53 @@ class PlexAPI:
         self._base_url = base_url.rstrip("/")
         self._x_token = x_token
         self._server_id = server_id
+        # Token query is the same for every direct URL, build it once
+        self._token_query = urllib.parse.urlencode({"X-Plex-Token": x_token})
+        # Read-only library responses, keyed by request path
+        self._cache: dict[str, dict[str, tp.Any]] = {}
+        # Section key -> {part file path -> ratingKey}
+        self._path_indexes: dict[str, dict[str, str]] = {}
+        # Library responses persisted between runs, one file per server and token
+        digest = hashlib.sha256(f"{self._base_url}|{x_token}".encode()).hexdigest()
+        self._disk_cache_path = Path(config.CACHE_DIR) / "plex" / f"{digest[:16]}.json"
+        self._from_disk: set[str] = set()
+
+    def _client_kwargs(self) -> dict[str, tp.Any]:
+        # httpx and its TLS/HTTP stack are imported on the first Plex request only
+        import httpx
+
+        return {
+            "base_url": self._base_url,
+            "headers": {"Accept": "application/json"},
+            "params": {"X-Plex-Token": self._x_token},
+            "limits": httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            "timeout": 30.0,
+        }
+
+    @functools.cached_property
+    def _client(self) -> "httpx.Client":
+        """Pooled client, created on first request and reused (keep-alive)"""
+        import httpx
+
+        return httpx.Client(**self._client_kwargs())
+
+    def close(self) -> None:
+        if "_client" in self.__dict__:
+            self._client.close()
+            del self.__dict__["_client"]
+
+    def __enter__(self) -> "PlexAPI":
+        return self
+
+    def __exit__(self, *exc_info: tp.Any) -> None:
+        self.close()
 
     @classmethod
     def from_direct_url(cls, direct_url: str) -> "PlexAPI":
         """
         https://192-168-178-47.<server_id>.plex.direct:32400/library/parts/2817/1681580846/file.mkv?download=1&X-Plex-Token=token
         """
-        parsed = urllib.parse.urlparse(direct_url)
+        parsed = urllib.parse.urlsplit(direct_url)
         server_id = parsed.netloc.split(".")[0]
         x_token = urllib.parse.parse_qs(parsed.query)["X-Plex-Token"][0]
         base_url = f"{parsed.scheme}://{parsed.netloc}"
@@ -55,7 +119,7 @@ class PlexAPI:
     def get_direct_url(self, path: str) -> str:
         if self._server_id is None:
             raise Exit("Plex Server ID is not provided")
-        return f"{self._base_url}/{path}?X-Plex-Token={self._x_token}"
+        return f"{self._base_url}/{path}?{self._token_query}"
 
     @staticmethod
     def encode_url(url: str) -> str:
@@ -67,15 +131,9 @@ class PlexAPI:
         path: str,
         params: dict[str, str] | None = None,
     ) -> dict[str, tp.Any]:
-        url = f"{self._base_url}/{path.lstrip('/')}"
-        headers = {
-            "Accept": "application/json",
-        }
-        params = params or {}
-        params["X-Plex-Token"] = self._x_token
-        response = httpx.request(method, url, params=params, headers=headers)
+        response = self._client.request(method, path.lstrip("/"), params=params)
         response.raise_for_status()
-        return response.json()
+        return utils.json_loads(response.content)
 
     def _get(
         self,
@@ -84,13 +142,106 @@ class PlexAPI:
     ) -> dict[str, tp.Any]:
         return self._request("GET", path, params)
 
+    @functools.cached_property
+    def _disk_cache(self) -> dict[str, dict[str, tp.Any]]:
+        """Entries of the on-disk cache that are still within PLEX_CACHE_TTL"""
+        expires = time.time() - config.PLEX_CACHE_TTL
+        try:
+            entries = utils.json_loads(self._disk_cache_path.read_bytes())
+            return {
+                path: entry
+                for path, entry in entries.items()
+                if entry["time"] > expires and "data" in entry
+            }
+        except (OSError, ValueError, AttributeError, KeyError, TypeError):
+            # Unreadable or not the shape we write, start over instead of failing
+            return {}
+
+    def _lookup(self, path: str) -> dict[str, tp.Any] | None:
+        if path not in self._cache and config.PLEX_CACHE_TTL > 0:
+            entry = self._disk_cache.get(path)
+            if entry is not None:
+                self._cache[path] = entry["data"]
+                self._from_disk.add(path)
+        return self._cache.get(path)
+
+    def _store(self, path: str, data: dict[str, tp.Any], save: bool = True) -> None:
+        self._cache[path] = data
+        if config.PLEX_CACHE_TTL <= 0:
+            return
+        self._disk_cache[path] = {"time": time.time(), "data": data}
+        if save:
+            self._save_disk_cache()
+
+    def _save_disk_cache(self) -> None:
+        try:
+            self._disk_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._disk_cache_path.write_text(json.dumps(self._disk_cache))
+        except OSError as e:
+            echo.debug(f"Could not save Plex cache {self._disk_cache_path}: {e}")
+
+    def _invalidate(self, path: str) -> None:
+        self._cache.pop(path, None)
+        self._from_disk.discard(path)
+        if self._disk_cache.pop(path, None) is not None:
+            self._save_disk_cache()
+
+    def _invalidate_library(self, section_id: str) -> None:
+        self._path_indexes.pop(section_id, None)
+        self._invalidate(self._library_path(section_id))
+
+    def _get_cached(
+        self, path: str, params: dict[str, str] | None = None
+    ) -> dict[str, tp.Any]:
+        data = self._lookup(path)
+        if data is None:
+            data = self._get(path, params)
+            self._store(path, data)
+        return data
+
     # common methods
 
     def get_libraries(self) -> dict[str, tp.Any]:
-        return self._get("/library/sections")["MediaContainer"]
+        return self._get_cached(self._SECTIONS_PATH)["MediaContainer"]
+
+    @staticmethod
+    def _library_path(section_id: str) -> str:
+        return f"/library/sections/{section_id}/all"
 
     def get_library(self, section_id: str) -> dict[str, tp.Any]:
-        return self._get(f"/library/sections/{section_id}/all")["MediaContainer"]
+        path = self._library_path(section_id)
+        return self._get_cached(path, self._LIBRARY_PARAMS)["MediaContainer"]
+
+    async def _get_many(
+        self, requests: list[tuple[str, dict[str, str] | None]]
+    ) -> list[dict[str, tp.Any]]:
+        """GET several (path, params) concurrently over one async client"""
+        import asyncio
+
+        import httpx
+
+        async with httpx.AsyncClient(**self._client_kwargs()) as client:
+            responses = await asyncio.gather(
+                *(
+                    client.get(path.lstrip("/"), params=params)
+                    for path, params in requests
+                )
+            )
+        results = []
+        for response in responses:
+            response.raise_for_status()
+            results.append(utils.json_loads(response.content))
+        return results
+
+    async def _prefetch_libraries(self, section_ids: list[str]) -> None:
+        """Fetch several library sections concurrently into the response cache"""
+        paths = [self._library_path(key) for key in section_ids]
+        results = await self._get_many([(path, self._LIBRARY_PARAMS) for path in paths])
+        for path, data in zip(paths, results, strict=True):
+            self._store(path, data, save=False)
+        # One write for the whole batch, the file holds every cached library
+        if config.PLEX_CACHE_TTL > 0:
+            self._save_disk_cache()
 
     def get_metadata(self, id_: str):
         return self._get(f"/library/metadata/{id_}")
@@ -101,11 +252,26 @@ class PlexAPI:
     def get_streams(self, id_: str):
         return self._get(f"/library/stream/{id_}")
 
-    def do_scan(self, section_id: str, path: str | None = None):
+    def _scan_request(
+        self, section_id: str, path: str | None = None
+    ) -> tuple[str, dict[str, str]]:
         params = {}
         if path is not None:
             params["path"] = path
-        return self._get(f"/library/sections/{section_id}/refresh", params=params)
+        self._invalidate_library(section_id)
+        return f"/library/sections/{section_id}/refresh", params
+
+    def do_scan(self, section_id: str, path: str | None = None):
+        return self._get(*self._scan_request(section_id, path))
+
+    def do_scan_many(
+        self, items: list[tuple[str, str | None]]
+    ) -> list[dict[str, tp.Any]]:
+        """Refresh several (section_id, path) pairs concurrently"""
+        import asyncio
+
+        requests = [self._scan_request(section_id, path) for section_id, path in items]
+        return asyncio.run(self._get_many(requests))
 
     # specific methods
 
@@ -120,41 +286,136 @@ class PlexAPI:
             for directory in directories
         ]
 
-    def _get_directory_matched_prefix(self, path: Path) -> dict[str, tp.Any]:
-        sections = self.get_libraries()
-        directories = sections.get("Directory", [])  # type: ignore
-        all_pathes = []
-        for directory in directories:
-            for location in directory.get("Location", []):
-                if path.as_posix().startswith(location["path"]):
-                    return directory
-                all_pathes.append(location["path"])
+    @functools.cached_property
+    def _locations(self) -> list[tuple[str, dict[str, tp.Any]]]:
+        """(location path, directory) pairs, longest prefix first"""
+        directories = self.get_libraries().get("Directory", [])  # type: ignore
+        return sorted(
+            (
+                (location["path"], directory)
+                for directory in directories
+                for location in directory.get("Location", [])
+            ),
+            key=lambda item: -len(item[0]),
+        )
+
+    def _match_location(self, posix: str) -> dict[str, tp.Any] | None:
+        for location_path, directory in self._locations:
+            if posix.startswith(location_path):
+                return directory
+        return None
+
+    def _get_directory_matched_prefix(self, path: Path | str) -> dict[str, tp.Any]:
+        posix = _arg(path)
+        directory = self._match_location(posix)
+        if directory is None and self._SECTIONS_PATH in self._from_disk:
+            # The location may have been added after the sections were cached, refetch once
+            self._invalidate(self._SECTIONS_PATH)
+            self.__dict__.pop("_locations", None)
+            directory = self._match_location(posix)
+        if directory is not None:
+            return directory
+        all_pathes = [location_path for location_path, _ in self._locations]
         raise Exit(
             f"No library found for path: {path}.\nAvailable pathes:\n{utils.format_list(all_pathes)}"
         )
 
-    def _get_media_key_from_directory(self, key: str, path: Path) -> str:
-        for title_metadata in self.get_library(key)["Metadata"]:
-            for media in title_metadata.get("Media", []):
-                for part in media.get("Part", []):
-                    if path.as_posix() == part["file"]:
-                        return title_metadata["ratingKey"]
-        raise Exit(f"No media found for path: {path}, directory key: {key}")
+    def _path_index(self, key: str) -> dict[str, str]:
+        """Map every part file of a library section to its ratingKey (built once)"""
+        if key not in self._path_indexes:
+            index: dict[str, str] = {}
+            for title_metadata in self.get_library(key)["Metadata"]:
+                for media in title_metadata.get("Media", []):
+                    for part in media.get("Part", []):
+                        file = str(PurePosixPath(part["file"]))
+                        index.setdefault(file, title_metadata["ratingKey"])
+            self._path_indexes[key] = index
+        return self._path_indexes[key]
+
+    def _get_media_key_from_directory(self, key: str, path: Path | str) -> str:
+        # Same normalization as the index keys (duplicate and trailing slashes)
+        posix = str(PurePosixPath(_arg(path)))
+        if (
+            posix not in self._path_index(key)
+            and self._library_path(key) in self._from_disk
+        ):
+            # The file may have been added after the section was cached, refetch once
+            self._invalidate_library(key)
+        try:
+            return self._path_index(key)[posix]
+        except KeyError:
+            raise Exit(f"No media found for path: {path}, directory key: {key}") from None
 
     def get_library_id_by_path(self, path: Path) -> str:
-        directory = self._get_directory_matched_prefix(path)
+        posix = path.as_posix()
+        directory = self._get_directory_matched_prefix(posix)
         key = directory["key"]
-        return self._get_media_key_from_directory(key, path)
+        return self._get_media_key_from_directory(key, posix)
 
     def get_stream_url(self, path: Path) -> str:
         key = self.get_library_id_by_path(path)
         return self.get_direct_url(f"/library/metadata/{key}/media/0/file.mkv")
 
+    def get_stream_urls(self, paths: list[Path]) -> list[str]:
+        """Resolve several paths: sections list is fetched once, the libraries of
+        different sections concurrently"""
+        section_ids = dict.fromkeys(
+            self._get_directory_matched_prefix(path)["key"] for path in paths
+        )
+        missing = [
+            key for key in section_ids if self._lookup(self._library_path(key)) is None
+        ]
+        if len(missing) > 1:
+            import asyncio
+
+            asyncio.run(self._prefetch_libraries(missing))
+        return [self.get_stream_url(path) for path in paths]
+
 
 class Nginx:
     """Wrapper around nginx command"""
 
     _cmd = "nginx"
+    # Line placeholders carry their own indentation, nginx variables are escaped as $$
+    _SITE_TPL = string.Template(
+        utils.dedent("""
+            server {
+            $listen_ipv4
+            $listen_ipv6
+                server_name $server_name;
+
+            $ssl_config
+
+                # Block root access
+                location = / {
+                    return 403;
+                }
+
+                # Serve media files
+                location /media/ {
+                    alias "$media_path/";
+                    autoindex $autoindex;
+
+                    # Secure with token authentication
+                    set $$allow_access 0;
+                    set $$secret "$secret";
+                    if ($$arg_x-token = $$secret) {
+                        set $$allow_access 1;
+                    }
+                    if ($$allow_access = 0) {
+                        return 403;
+                    }
+
+                    types {
+                        video/mp4 mp4;
+                        text/html html;
+                        text/vtt vtt;
+                    }
+                    default_type application/octet-stream;
+                }
+            }
+        """)
+    )
 
     @classmethod
     @functools.cache
@@ -165,12 +426,9 @@ class Nginx:
     @classmethod
     def _run(cls, *args: tp.Any, what_happens: str, exit_on_error: bool = True) -> str:
         cls.exit_if_not_installed()
-        cmd = ["sudo", "-S", cls._cmd, *map(str, args)]
-        password = utils.get_sudo_pass(cmd, what_happens=what_happens)
-        return utils.run_process(
-            cmd,
-            exit_on_error=exit_on_error,
-            input_=password,
+        cmd = ["sudo", "-S", cls._cmd, *map(_arg, args)]
+        return utils.run_sudo(
+            cmd, what_happens=what_happens, exit_on_error=exit_on_error
         ).stdout
 
     @classmethod
@@ -196,17 +454,16 @@ class Nginx:
         ssl: bool = False,
         server_name: str | None = None,
     ) -> str:
-        ssl_certificate = Path(f"/etc/letsencrypt/live/{server_name}/fullchain.pem")
-        ssl_certificate_key = Path(f"/etc/letsencrypt/live/{server_name}/privkey.pem")
-
         if ssl and not server_name:
             raise Exit("Server name is required for SSL configuration")
 
-        ssl_config = (
-            utils.indent(
-                f"""
-                ssl_certificate {ssl_certificate};
-                ssl_certificate_key {ssl_certificate_key};
+        ssl_config = ""
+        ssl_suffix = ""
+        if ssl:
+            letsencrypt_dir = Path("/etc/letsencrypt/live") / str(server_name)
+            ssl_config = utils.indent(f"""
+                ssl_certificate {letsencrypt_dir / "fullchain.pem"};
+                ssl_certificate_key {letsencrypt_dir / "privkey.pem"};
                 ssl_protocols TLSv1.2 TLSv1.3;
                 ssl_ciphers HIGH:!aNULL:!MD5;
 
@@ -214,62 +471,21 @@ class Nginx:
                 if ($scheme != "https") {{
                     return 301 https://$host$request_uri;
                 }}
-                """,
-                spaces=16,
-            )
-            if ssl
-            else ""
-        )
-
-        listen_ipv6 = (
-            (f"listen [::]:{port} ssl;" if ssl else f"listen [::]:{port};")
-            if ipv6
-            else ""
-        )
-        listen_ipv4 = (
-            (f"listen {port} ssl;" if ssl else f"listen {port};") if ipv4 else ""
+            """)
+            ssl_suffix = " ssl"
+
+        return self._SITE_TPL.substitute(
+            listen_ipv4=f"    listen {port}{ssl_suffix};" if ipv4 else "",
+            listen_ipv6=f"    listen [::]:{port}{ssl_suffix};" if ipv6 else "",
+            server_name=server_name or "_",
+            ssl_config=ssl_config,
+            media_path=media_path.as_posix(),
+            autoindex="on" if allow_index else "off",
+            secret=secret,
         )
 
-        return utils.dedent(f"""
-            server {{
-                {listen_ipv4}
-                {listen_ipv6}
-                server_name {server_name or "_"};
 
-{ssl_config}
-
-                # Block root access
-                location = / {{
-                    return 403;
-                }}
-
-                # Serve media files
-                location /media/ {{
-                    alias "{media_path.as_posix()}/";
-                    autoindex {"on" if allow_index else "off"};
-
-                    # Secure with token authentication
-                    set $allow_access 0;
-                    set $secret "{secret}";
-                    if ($arg_x-token = $secret) {{
-                        set $allow_access 1;
-                    }}
-                    if ($allow_access = 0) {{
-                        return 403;
-                    }}
-
-                    types {{
-                        video/mp4 mp4;
-                        text/html html;
-                        text/vtt vtt;
-                    }}
-                    default_type application/octet-stream;
-                }}
-            }}
-        """)
-
-
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class FfmpegStream:
     index: int
     type: tp.Literal["video", "audio", "subtitle"]
@@ -284,8 +500,18 @@ class FfmpegStream:
             t += f" [{self.language}]"
         return t
 
+    def to_dict(self) -> dict[str, tp.Any]:
+        return {
+            "index": self.index,
+            "type": self.type,
+            "codec": self.codec,
+            "title": self.title,
+            "encoding_info": self.encoding_info,
+            "language": self.language,
+        }
+
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class FfmpegMediaInfo:
     filename: Path
     title: str
@@ -294,6 +520,19 @@ class FfmpegMediaInfo:
     streams: list[FfmpegStream]
     comment: str | None = None
 
+    # Patterns for ffmpeg -i output, compiled once for every parsed line
+    _FROM_RE: tp.ClassVar[re.Pattern[str]] = re.compile(r"from '(.+)'")
+    _DURATION_RE: tp.ClassVar[re.Pattern[str]] = re.compile(r"Duration: (.+?),")
+    _COMMENT_RE: tp.ClassVar[re.Pattern[str]] = re.compile(r"comment\s+:\s+(.+)")
+    _TITLE_RE: tp.ClassVar[re.Pattern[str]] = re.compile(r"title\s+:\s+(.+)")
+    _BITRATE_RE: tp.ClassVar[re.Pattern[str]] = re.compile(r"bitrate:\s+(.+)")
+    _STREAM_RE: tp.ClassVar[re.Pattern[str]] = re.compile(
+        r"Stream #\d+:(\d+)(?:\[0x[0-9a-f]+\])?(?:\((\w+)\))?\s*:\s*(\w+)\s*:\s*(\w+)(.*)"
+    )
+    _BURNED_SUBS_RE: tp.ClassVar[re.Pattern[str]] = re.compile(
+        r"burned-subs-lang:(\w{2,3})"
+    )
+
     def __repr__(self) -> str:
         return f"{self.title} ({self.filename})"
 
@@ -314,7 +553,7 @@ class FfmpegMediaInfo:
 
     def get_burned_subtitles_lang(self) -> str | None:
         if self.comment:
-            match = re.search(r"burned-subs-lang:(\w{2,3})", self.comment)
+            match = self._BURNED_SUBS_RE.search(self.comment)
             if match:
                 return match.group(1)
         return None
@@ -343,30 +582,30 @@ class FfmpegMediaInfo:
             if "Estimating duration from bitrate" in line:
                 continue
             if ", from '" in line:
-                match = re.search(r"from '(.+)'", line)
+                match = cls._FROM_RE.search(line)
                 if match:
                     filename = Path(match.group(1))
             if "Duration" in line:
-                match = re.search(r"Duration: (.+?),", line)
+                match = cls._DURATION_RE.search(line)
                 if match:
                     if match.group(1) != "N/A":
                         duration = utils.parse_duration(match.group(1))
                 else:
                     echo.warning(f"{filename} | Cannot parse duration from line: {line}")
             if "comment" in line:
-                match = re.search(r"comment\s+:\s+(.+)", line)
+                match = cls._COMMENT_RE.search(line)
                 if match:
                     comment = match.group(1)
                 else:
                     echo.warning(f"{filename} | Cannot parse comment from line: {line}")
             if line.startswith("title") and last_stream_info is None:
-                match = re.search(r"title\s+:\s+(.+)", line)
+                match = cls._TITLE_RE.match(line)
                 if match:
                     title = match.group(1)
                 else:
                     echo.warning(f"{filename} | Cannot parse title from line: {line}")
             if "bitrate" in line:
-                match = re.search(r"bitrate:\s+(.+)", line)
+                match = cls._BITRATE_RE.search(line)
                 if match:
                     if match.group(1) != "N/A":
                         bitrate = match.group(1)
@@ -376,10 +615,7 @@ class FfmpegMediaInfo:
                 if last_stream_info:
                     last_stream_info.title = last_stream_info.title or default_title
                     streams.append(last_stream_info)
-                match = re.search(
-                    r"Stream #\d+:(\d+)(?:\[0x[0-9a-f]+\])?(?:\((\w+)\))?\s*:\s*(\w+)\s*:\s*(\w+)(.*)",
-                    line,
-                )
+                match = cls._STREAM_RE.search(line)
                 if match:
                     index, lang, type_, codec, encoding_info = match.groups()
                     last_stream_info = FfmpegStream(
@@ -396,7 +632,7 @@ class FfmpegMediaInfo:
                         f"{filename} | Could not parse stream info from line: {line}"
                     )
             if line.startswith("title") and last_stream_info:
-                match = re.search(r"title\s+:\s+(.+)", line)
+                match = cls._TITLE_RE.match(line)
                 if match:
                     last_stream_info.title = match.group(1)
                 else:
@@ -418,40 +654,134 @@ class FfmpegMediaInfo:
         )
 
     def to_dict(self) -> dict[str, tp.Any]:
-        d = dataclasses.asdict(self)
-        d["duration"] = str(d["duration"])
-        d["filename"] = d["filename"].as_posix()
-        return d
+        # Fields are flat, so build the dict directly instead of asdict's deep copy
+        return {
+            "filename": self.filename.as_posix(),
+            "title": self.title,
+            "bitrate": self.bitrate,
+            "duration": str(self.duration),
+            "streams": [stream.to_dict() for stream in self.streams],
+            "comment": self.comment,
+        }
+
+
+class ProbeCache:
+    """On-disk cache of `ffmpeg -i` output keyed by (path, size, mtime)"""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._data: dict[str, dict[str, tp.Any]] | None = None
+        self._dirty = False
+
+    def _load(self) -> dict[str, dict[str, tp.Any]]:
+        if self._data is None:
+            try:
+                self._data = utils.json_loads(self._path.read_bytes())
+            except (OSError, ValueError):
+                self._data = {}
+            atexit.register(self.save)
+        return self._data
+
+    @staticmethod
+    def _stamp(path: Path) -> list[int]:
+        stat = path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, path: Path, flags: tp.Sequence[str] = ()) -> str | None:
+        try:
+            stamp = self._stamp(path)
+        except OSError:
+            return None
+        entry = self._load().get(path.as_posix())
+        # A probe run with other limits may have missed late streams
+        if entry is None or entry["stamp"] != stamp or entry.get("flags") != list(flags):
+            return None
+        return entry["output"]
+
+    def set(self, path: Path, output: str, flags: tp.Sequence[str] = ()) -> None:
+        try:
+            stamp = self._stamp(path)
+        except OSError:
+            return
+        self._load()[path.as_posix()] = {
+            "stamp": stamp,
+            "flags": list(flags),
+            "output": output,
+        }
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty or self._data is None:
+            return
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._path.write_text(json.dumps(self._data))
+            self._dirty = False
+        except OSError as e:
+            echo.debug(f"Could not save probe cache {self._path}: {e}")
 
 
 class Ffmpeg:
     """Wrapper around ffmpeg command"""
 
     _cmd = "ffmpeg"
+    _probe_cache = ProbeCache(Path(config.CACHE_DIR) / "probe.json")
 
     @classmethod
     @functools.cache
-    def exit_if_not_installed(cls):
-        if shutil.which(cls._cmd) is None:
+    def _resolved(cls) -> str:
+        """Absolute path of the binary, PATH is searched once per process"""
+        path = shutil.which(cls._cmd)
+        if path is None:
             raise Exit(f"'{cls._cmd}' is not found in PATH", code=2)
+        return path
+
+    @classmethod
+    def exit_if_not_installed(cls):
+        cls._resolved()
 
     @classmethod
     def _run(cls, *args: tp.Any, **kwargs) -> str:
-        cls.exit_if_not_installed()
-        cmd = [cls._cmd, *map(str, args)]
+        cmd = [cls._resolved(), *map(_arg, args)]
         return utils.run_process(cmd, **kwargs).stdout
 
+    @staticmethod
+    def _probe_flags(path: Path | str) -> list[str]:
+        """Header-only probe limits for remote inputs, local files keep ffmpeg defaults"""
+        return config.FFMPEG_PROBE_FLAGS if "://" in str(path) else []
+
+    @classmethod
+    def probe_cached(cls, path: Path | str) -> str:
+        """`ffmpeg -i` output, served from the probe cache when the file is unchanged"""
+        flags = cls._probe_flags(path)
+        output = cls._probe_cache.get(Path(path), flags) if config.PROBE_CACHE else None
+        if output is None:
+            output = cls._run(
+                *flags,
+                "-i",
+                path,
+                "-hide_banner",
+                exit_on_error=False,
+            )
+            if config.PROBE_CACHE:
+                cls._probe_cache.set(Path(path), output, flags)
+        return output
+
     @classmethod
-    @functools.cache
     def get_media_info(cls, path: Path) -> FfmpegMediaInfo:
         path = utils.resolve_path_pwd(path)
-        res = cls._run(
-            "-i",
-            path,
-            "-hide_banner",
-            exit_on_error=False,
-        )
-        return FfmpegMediaInfo.parse(res, path.relative_to(path.parent))
+        try:
+            stamp = tuple(ProbeCache._stamp(path))
+        except OSError:
+            stamp = None
+        return cls._media_info(path, stamp)
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def _media_info(cls, path: Path, stamp: tuple[int, ...] | None) -> FfmpegMediaInfo:
+        """Parsed probe, re-run once the file is rewritten (size or mtime changed)"""
+        res = cls.probe_cached(path)
+        return FfmpegMediaInfo.parse(res, Path(path.name))
 
     @classmethod
     def print_media_info(cls, path: Path) -> FfmpegMediaInfo:
@@ -479,8 +809,22 @@ class Ffmpeg:
             )
         return media_file_info
 
+    # Text subtitle codec -> (file extension, muxer) for stream copy
+    SUBTITLE_COPY_FORMATS: tp.ClassVar[dict[str, tuple[str, str]]] = {
+        "subrip": ("srt", "srt"),
+        "srt": ("srt", "srt"),
+        "ass": ("ass", "ass"),
+        "ssa": ("ssa", "ass"),
+        "webvtt": ("vtt", "webvtt"),
+    }
+
     def extract_subtitle(
-        self, media_file: Path, stream_index: int, subtitle_lang: str | None
+        self,
+        media_file: Path,
+        stream_index: int,
+        subtitle_lang: str | None,
+        webvtt: bool = False,
+        assume_yes: bool = False,
     ) -> Path:
         media_file_info = self.get_media_info(media_file)
         if stream_index >= len(media_file_info.streams):
@@ -502,15 +846,25 @@ class Ffmpeg:
             echo.warning(
                 f"Subtitle language mismatch: {subtitle.language} != {subtitle_lang}"
             )
+        if subtitle.codec in config.BITMAP_SUBTITLE_CODECS:
+            raise Exit(
+                f"Bitmap subtitles ({subtitle.codec}) can't be extracted as text. "
+                "Use --burn-subtitles or an external subtitle file"
+            )
         subtitle_lang = (
             subtitle_lang or subtitle.language or utils.prompt_subtitles(subtitle)
         ).lower()[:3]
+        # Text subtitles are stream-copied, anything else is converted to WebVTT
+        extension, muxer = self.SUBTITLE_COPY_FORMATS.get(
+            subtitle.codec, ("vtt", "webvtt")
+        )
+        codec = "copy" if subtitle.codec in self.SUBTITLE_COPY_FORMATS else "webvtt"
         echo.info(
             f"Extracting subtitle: {subtitle.title} [{subtitle_lang}] from {media_file}"
         )
-        subtitle_file = media_file.with_suffix(f".{subtitle_lang[:2]}.{subtitle.codec}")
+        subtitle_file = media_file.with_suffix(f".{subtitle_lang[:2]}.{extension}")
         if subtitle_file.exists():
-            if config.OVERWRITE_DEFAULT:
+            if config.OVERWRITE_DEFAULT or assume_yes:
                 subtitle_file.unlink()
             elif utils.confirm(
                 f"Subtitle file already exists: {subtitle_file.name}. Do you want to overwrite it?"
@@ -518,18 +872,39 @@ class Ffmpeg:
                 subtitle_file.unlink()
             else:
                 return subtitle_file
+        # Write the browser-ready WebVTT copy in the same demux pass
+        vtt_args: list[tp.Any] = []
+        if webvtt and extension != "vtt":
+            vtt_args = [
+                "-map",
+                f"0:{stream_index}",
+                "-c:s",
+                "webvtt",
+                "-f",
+                "webvtt",
+                "-metadata:s:s:0",
+                f"language={subtitle_lang}",
+                "-y",
+                subtitle_file.with_suffix(".vtt"),
+            ]
         self._run(
             "-i",
             media_file,
             "-map",
             f"0:{stream_index}",
+            "-c:s",
+            codec,
+            "-f",
+            muxer,
             "-metadata:s:s:0",
             f"language={subtitle_lang}",
             "-y",
             subtitle_file,
+            *vtt_args,
             live_output=True,
         )
-        return subtitle_file
+        # The WebVTT copy is what gets served, callers need not convert again
+        return subtitle_file.with_suffix(".vtt") if vtt_args else subtitle_file
 
     def _assert_input_output_equal(self, input_file: Path, output_file: Path):
         if input_file == output_file:
@@ -562,73 +937,72 @@ class Ffmpeg:
         """
         echo.info(f"Converting media file: {media_file} to MP4 format")
         self._assert_input_output_equal(media_file, output_file)
-        cur_index = 0
-        index_audio = index_subtitle = 1
-        args = [
-            "-i",
-            media_file,
-        ]
-        if audio_file is not None:
-            index_audio = cur_index + 1
-            cur_index += 1
-            args.extend(["-i", audio_file])
+        embed_subtitles = subtitle_file is not None and not burn_subtitles
         if subtitle_file is not None:
-            if not burn_subtitles:
-                index_subtitle = cur_index + 1
-                cur_index += 1
-                args.extend(["-i", subtitle_file])
             subtitle_lang = (
                 subtitle_lang or utils.prompt_subtitles(subtitle_file)
             ).lower()[:3]
-        args.extend(
-            [
-                "-map",
-                "0:v:0",
-            ]
-        )
+        # Input 0 is the media file, external audio/subtitles follow in order
+        audio_input = ("-i", audio_file) if audio_file is not None else ()
+        subtitle_input = ("-i", subtitle_file) if embed_subtitles else ()
+        index_subtitle = 2 if audio_file is not None else 1
+
         if burn_subtitles and subtitle_file:
-            args.extend(
-                [
-                    "-c:v",
-                    "libx264",
-                    "-crf",
-                    config.FFPEG_ENCODE_CRF,
-                    "-preset",
-                    config.FFPEG_ENCODE_PRESET,
-                    "-vf",
-                    f"subtitles={subtitle_file}",
-                    "-metadata",
-                    f"comment=burned-subs-lang:{subtitle_lang}",
-                ]
+            video_args: tuple[str | Path, ...] = (
+                "-c:v",
+                "libx264",
+                "-crf",
+                config.FFPEG_ENCODE_CRF,
+                "-preset",
+                config.FFPEG_ENCODE_PRESET,
+                "-vf",
+                f"subtitles={subtitle_file}",
+                "-metadata",
+                f"comment=burned-subs-lang:{subtitle_lang}",
             )
         else:  # then copy video stream
-            args.extend(
-                [
-                    "-c:v",
-                    "copy",
-                ]
-            )
+            video_args = ("-c:v", "copy")
         if audio_file:
-            args.extend(["-map", f"{index_audio}:a:0", "-c:a", "copy"])
+            audio_map = "1:a:0"
         elif audio_stream is not None:
-            args.extend(["-map", f"0:{audio_stream}", "-c:a", "copy"])
+            audio_map = f"0:{audio_stream}"
         else:
             # Copy all audio streams from input when no specific audio is selected
-            args.extend(["-map", "0:a?", "-c:a", "copy"])
-        if audio_lang:
-            args.extend(["-metadata:s:a:0", f"language={audio_lang.lower()[:3]}"])
-        if subtitle_file and not burn_subtitles:
-            args.extend(
-                [
-                    "-map",
-                    f"{index_subtitle}:0",
-                    "-c:s",
-                    "mov_text",
-                    "-metadata:s:s:0",
-                    f"language={subtitle_lang}",
-                ]
+            audio_map = "0:a?"
+        audio_metadata = (
+            ("-metadata:s:a:0", f"language={audio_lang.lower()[:3]}")
+            if audio_lang
+            else ()
+        )
+        subtitle_args = (
+            (
+                "-map",
+                f"{index_subtitle}:0",
+                "-c:s",
+                "mov_text",
+                "-metadata:s:s:0",
+                f"language={subtitle_lang}",
             )
-        args.extend(["-y", output_file])
+            if embed_subtitles
+            else ()
+        )
+        args = [
+            "-i",
+            media_file,
+            *audio_input,
+            *subtitle_input,
+            "-map",
+            "0:v:0",
+            *video_args,
+            "-map",
+            audio_map,
+            "-c:a",
+            "copy",
+            *audio_metadata,
+            *subtitle_args,
+            "-y",
+            output_file,
+        ]
         self._run(*args, live_output=True)
         return output_file
 
@@ -666,6 +1040,8 @@ class Ffmpeg:
         subtitle_indices: list[int] | None = None,
         extra_args: list[str] | None = None,
         audio_lang_metadata: str | None = None,
+        subtitle_stream: FfmpegStream | None = None,
+        subtitle_output: Path | None = None,
     ) -> Path:
         """Repack media file to MP4.
 
@@ -673,6 +1049,10 @@ class Ffmpeg:
         - **External file** (``audio_file``): muxes audio from a separate file.
         - **Index mode** (``audio_indices``): maps specific streams by ffmpeg index.
         - **Language mode** (``audio_langs``): maps every stream of the given languages.
+
+        With ``subtitle_stream`` and ``subtitle_output`` the subtitle is written as
+        external SRT by the same ffmpeg run, so the source is read only once.
+        Bitmap subtitles can't become SRT and are skipped, the repack still runs.
         """
         echo.info(f"Repacking: {input_file.name} -> {output_file.name}")
 
@@ -752,57 +1132,45 @@ class Ffmpeg:
         if config.FFMPEG_REPACK_EXTRA_FLAGS:
             args.extend(config.FFMPEG_REPACK_EXTRA_FLAGS)
         args.extend(["-y", output_file])
+        if subtitle_stream is not None and subtitle_output is not None:
+            if subtitle_stream.codec in config.BITMAP_SUBTITLE_CODECS:
+                echo.warning(
+                    f"Bitmap subtitles ({subtitle_stream.codec}) can't be extracted as "
+                    "SRT, skipping the subtitle output"
+                )
+            else:
+                args.extend(cls._srt_output_args(subtitle_stream, subtitle_output))
         cls._run(*args, live_output=True)
         return output_file
 
-    def extract_subs_to_file(
-        self,
-        input_file: Path,
-        output_srt: Path,
+    @staticmethod
+    def find_subtitle_stream(
+        media_info: FfmpegMediaInfo,
         subtitle_lang: str | None = None,
         subtitle_indices: list[int] | None = None,
         subtitle_langs: list[str] | None = None,
-    ) -> Path | None:
-        """Extract subtitles from media file as external SRT."""
-        media_info = self.get_media_info(input_file)
-        if not media_info.subtitles:
-            return None
-
-        sub_stream = None
+    ) -> FfmpegStream | None:
+        """Pick the subtitle stream to extract: by index, then languages, then language"""
         if subtitle_indices:
-            sub_stream = next(
+            return next(
                 (s for s in media_info.subtitles if s.index == subtitle_indices[0]), None
             )
-        elif subtitle_langs:
-            for lang in subtitle_langs:
-                sub_stream = next(
-                    (
-                        s
-                        for s in media_info.subtitles
-                        if s.language and s.language == lang
-                    ),
-                    None,
-                )
-                if sub_stream:
-                    break
-        elif subtitle_lang:
+        for lang in subtitle_langs or ([subtitle_lang] if subtitle_lang else []):
             sub_stream = next(
-                (
-                    s
-                    for s in media_info.subtitles
-                    if s.language and s.language == subtitle_lang
-                ),
+                (s for s in media_info.subtitles if s.language and s.language == lang),
                 None,
             )
+            if sub_stream:
+                return sub_stream
+        return None
 
-        if sub_stream is None:
-            return None
-
+    @staticmethod
+    def _srt_output_args(
+        sub_stream: FfmpegStream, output_srt: Path, subtitle_lang: str | None = None
+    ) -> list[str | Path]:
         lang = subtitle_lang or sub_stream.language or "und"
         echo.info(f"Extracting subtitle [{lang}] -> {output_srt.name}")
-        self._run(
-            "-i",
-            input_file,
+        return [
             "-map",
             f"0:{sub_stream.index}",
             "-c:s",
@@ -811,6 +1179,30 @@ class Ffmpeg:
             f"language={lang.lower()[:3]}",
             "-y",
             output_srt,
+        ]
+
+    def extract_subs_to_file(
+        self,
+        input_file: Path,
+        output_srt: Path,
+        subtitle_lang: str | None = None,
+        subtitle_indices: list[int] | None = None,
+        subtitle_langs: list[str] | None = None,
+    ) -> Path | None:
+        """Extract subtitles from media file as external SRT."""
+        media_info = self.get_media_info(input_file)
+        sub_stream = self.find_subtitle_stream(
+            media_info,
+            subtitle_lang=subtitle_lang,
+            subtitle_indices=subtitle_indices,
+            subtitle_langs=subtitle_langs,
+        )
+        if sub_stream is None:
+            return None
+        self._run(
+            "-i",
+            input_file,
+            *self._srt_output_args(sub_stream, output_srt, subtitle_lang),
             live_output=True,
         )
         return output_srt
@@ -953,21 +1345,43 @@ class Ffmpeg:
 
 
 class HTML:
-    @staticmethod
+    _VIDEO_TPL = string.Template(
+        utils.dedent("""
+            <video controls style="position: fixed; top: 0; left: 0; width: 100vw; height: 100vh; object-fit: cover;">
+                <source src="$video_url" type="video/mp4">
+                <track src="$subtitles_url" kind="subtitles" srclang="$srclang" label="$language">
+                Your browser does not support the video tag.
+            </video>
+        """)
+    )
+
+    @classmethod
     def get_video_html_with_subtitles(
+        cls,
         video_url: str,
         subtitles_url: str,
         language: str = "English",
     ) -> str:
         language = language.capitalize()
-        srclang = language.lower()[0:2]
-        return utils.dedent(f"""
-            <video controls style="position: fixed; top: 0; left: 0; width: 100vw; height: 100vh; object-fit: cover;">
-                <source src="{video_url}" type="video/mp4">
-                <track src="{subtitles_url}" kind="subtitles" srclang="{srclang}" label="{language}">
-                Your browser does not support the video tag.
-            </video>
-        """)
+        return cls._VIDEO_TPL.substitute(
+            video_url=video_url,
+            subtitles_url=subtitles_url,
+            srclang=language.lower()[0:2],
+            language=language,
+        )
+
+    @classmethod
+    def get_video_html_with_inline_subtitles(
+        cls,
+        video_url: str,
+        subtitle_bytes: bytes,
+        language: str = "English",
+    ) -> str:
+        """Embed VTT subtitles as a data URI (no extra request to the server)"""
+        subtitles_url = (
+            "data:text/vtt;base64," + base64.b64encode(subtitle_bytes).decode()
+        )
+        return cls.get_video_html_with_subtitles(video_url, subtitles_url, language)
 
 
 class FS:
@@ -975,9 +1389,8 @@ class FS:
 
     @staticmethod
     def get_extension(path: Path) -> str:
-        if not path.suffixes:
-            return ""
-        return path.suffixes[-1].lstrip(".")
+        # Path.suffix is a single rfind, .suffixes would build the whole list
+        return path.suffix[1:]
 
     @classmethod
     def get_files_with_extensions(
@@ -989,15 +1402,20 @@ class FS:
     ) -> tp.Generator[Path, None, None]:
         directories: list[Path] = []
         files: list[Path] = []
-        for path in directory.iterdir():
-            # Skip hidden files and system files
-            if path.name.startswith("."):
-                continue
-            if path.is_dir() and max_dirs > 0 and recursive_depth > 0:
-                max_dirs -= 1
-                directories.append(path)
-            elif path.is_file() and cls.get_extension(path) in extensions:
-                files.append(path)
+        # DirEntry type checks reuse the readdir result instead of a stat per entry
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                # Skip hidden files and system files
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir() and max_dirs > 0 and recursive_depth > 0:
+                    max_dirs -= 1
+                    directories.append(Path(entry.path))
+                elif (
+                    os.path.splitext(entry.name)[1][1:].lower() in extensions
+                    and entry.is_file()
+                ):
+                    files.append(Path(entry.path))
         yield from files
         for path in directories:
             yield from cls.get_files_with_extensions(
@@ -1041,22 +1459,25 @@ class FS:
         echo.info(f"Creating directory: {path}")
         if sudo:
             command = ["sudo", "-S", "mkdir", "-p", path.as_posix()]
-            password = utils.get_sudo_pass(
-                command, what_happens="Directory would be created"
-            )
-            utils.run_process(command, input_=password)
+            utils.run_sudo(command, what_happens="Directory would be created")
         else:
             path.mkdir(parents=True)
 
     @staticmethod
     def write_file(path: Path, content: str, sudo: bool = False):
+        data = (content + "\n").encode()
+        try:
+            if path.read_bytes() == data:
+                echo.debug(f"File is up-to-date: {path}")
+                return
+        except OSError:
+            pass
         echo.info(f"Creating file: {path}")
         if sudo:
             with tempfile.NamedTemporaryFile("w", delete=False) as tmp:
                 tmp.write(content + "\n")
             command = ["sudo", "-S", "mv", tmp.name, path.as_posix()]
-            password = utils.get_sudo_pass(command, what_happens="File would be created")
-            utils.run_process(command, input_=password)
+            utils.run_sudo(command, what_happens="File would be created")
         else:
             with path.open("w") as f:
                 f.write(content + "\n")
@@ -1077,10 +1498,7 @@ class FS:
                 target_path.as_posix(),
                 symlink_path.as_posix(),
             ]
-            password = utils.get_sudo_pass(
-                command, what_happens="Symlink would be created"
-            )
-            utils.run_process(command, input_=password)
+            utils.run_sudo(command, what_happens="Symlink would be created")
         else:
             symlink_path.symlink_to(target_path)
 
@@ -1093,10 +1511,7 @@ class FS:
         echo.info(f"Removing symlink: {path}")
         if sudo:
             command = ["sudo", "-S", "rm", path.as_posix()]
-            password = utils.get_sudo_pass(
-                command, what_happens="Symlink would be removed"
-            )
-            utils.run_process(command, input_=password)
+            utils.run_sudo(command, what_happens="Symlink would be removed")
         else:
             path.unlink()
 
@@ -1107,11 +1522,21 @@ class FS:
         echo.info(f"Removing file: {path}")
         if sudo:
             command = ["sudo", "-S", "rm", path.as_posix()]
-            password = utils.get_sudo_pass(command, what_happens="File would be removed")
-            utils.run_process(command, input_=password)
+            utils.run_sudo(command, what_happens="File would be removed")
         else:
             path.unlink()
 
+    @staticmethod
+    def file_digest(path: Path) -> bytes:
+        """SHA-256 of the file contents, read in chunks"""
+        with path.open("rb") as f:
+            if hasattr(hashlib, "file_digest"):  # Python 3.11+
+                return hashlib.file_digest(f, "sha256").digest()
+            digest = hashlib.sha256()
+            while chunk := f.read(8192):
+                digest.update(chunk)
+            return digest.digest()
+
     @staticmethod
     def read_file(path: Path, **kwargs) -> str:
         with path.open(**kwargs) as f:
@@ -1127,7 +1552,10 @@ class FS:
         echo.info(
             f"Converting file {filename.name} encoding to UTF-8: {output_file.name}"
         )
-        content = cls.read_file(filename, encoding=encoding)
-        with output_file.open("w", encoding="utf-8") as f:
-            f.write(content)
+        # Re-encode chunk by chunk instead of holding the decoded file in memory
+        with (
+            filename.open(encoding=encoding) as src,
+            output_file.open("w", encoding="utf-8") as dst,
+        ):
+            shutil.copyfileobj(src, dst)
         return output_file
@@ -1,24 +1,31 @@
+import codecs
 import dataclasses
 import datetime as dt
+import errno
 import functools
 import json
 import os
+import re
 import secrets
 import shutil
 import subprocess
 import tempfile
-import textwrap
+import types
 import typing as tp
 import urllib.parse
 from pathlib import Path
 
-import chardet
 import click
 import typer
 
 import browser_stream.config as config
 from browser_stream.echo import echo
 
+try:
+    import orjson  # optional, `pip install browser-streamer[fast]`
+except ImportError:
+    orjson = None
+
 if tp.TYPE_CHECKING:
     from browser_stream.helpers import FfmpegStream
 
@@ -36,7 +43,9 @@ class PromptNeeded(Exception):
         super().__init__(message)
 
 
+@functools.lru_cache(maxsize=256)
 def bb(text: str) -> str:
+    # Mostly constant labels ("Command: ", "Select ..."), style each one once
     return typer.style(text, bold=True)
 
 
@@ -99,9 +108,10 @@ def resolve_path_pwd(path: Path) -> Path:
     path = path.expanduser()
     if path.is_absolute():
         return path
-    pwd = Path(os.environ.get("PWD", Path.cwd()))
-    resolved_path = pwd / path
-    return Path(os.path.normpath(resolved_path))
+    # getcwd() only as a fallback, and lexical normpath rather than resolve(): the
+    # shell's PWD keeps symlinked directories as the user typed them
+    pwd = os.environ.get("PWD") or os.getcwd()
+    return Path(os.path.normpath(os.path.join(pwd, path)))
 
 
 def prompt_path(message: str, exists: bool = True, hint: str = "") -> Path:
@@ -185,22 +195,20 @@ def select_multi_options(
     if allow_none and raw.strip() == "0":
         return []
 
-    selected: list[int] = []
-    for part in raw.split(","):
-        part = part.strip()
-        if part.isdigit():
-            idx = int(part) - 1
-            if 0 <= idx < len(options) and idx not in selected:
-                selected.append(idx)
+    indices = (int(part) - 1 for part in map(str.strip, raw.split(",")) if part.isdigit())
+    # dict.fromkeys drops repeats in input order without a list membership scan
+    selected = list(dict.fromkeys(idx for idx in indices if 0 <= idx < len(options)))
 
     return selected if selected else (sorted(default_set) if default_set else [0])
 
 
 def get_temp_file(suffix: str = "", create: bool = True) -> Path:
-    temp_file = Path(tempfile.mktemp(suffix=suffix, dir=Path.cwd(), prefix=".tmp"))
     if create:
-        temp_file.touch()
-    return temp_file
+        # mkstemp creates the file atomically (O_EXCL), unlike mktemp + touch
+        fd, name = tempfile.mkstemp(suffix=suffix, dir=Path.cwd(), prefix=".tmp")
+        os.close(fd)
+        return Path(name)
+    return Path.cwd() / f".tmp{secrets.token_hex(4)}{suffix}"
 
 
 def move_file(src: Path, dst: Path, overwrite: bool = False) -> None:
@@ -210,47 +218,82 @@ def move_file(src: Path, dst: Path, overwrite: bool = False) -> None:
         dst = dst / src.name
     if src.resolve() == dst.resolve():
         return
-    if dst.exists():
-        if overwrite:
-            # remove file
-            dst.unlink()
-        else:
-            raise FileExistsError(f"File `{dst}` already exists")
+    if dst.exists() and not overwrite:
+        raise FileExistsError(f"File `{dst}` already exists")
     echo.debug(f"Moving file `{src}` to `{dst}`")
-    shutil.move(src, dst)
+    try:
+        # One atomic rename on the same filesystem, an existing dst is replaced in place
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB", "PB")
 
 
 def format_size(size_bytes: int | float) -> str:
     """Format bytes as human-readable string (e.g. 4.3GB)."""
-    for unit in ("B", "KB", "MB", "GB", "TB"):
-        if abs(size_bytes) < 1024:
-            return f"{size_bytes:.1f}{unit}"
-        size_bytes /= 1024
-    return f"{size_bytes:.1f}PB"
+    # Units are 2**10 apart, so the bit length picks the unit without a division loop
+    bits = int(abs(size_bytes)).bit_length()
+    index = min(max(bits - 1, 0) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << 10 * index):.1f}{_SIZE_UNITS[index]}"
 
 
 def url_encode(url: str) -> str:
     return urllib.parse.quote(url, safe=":/?&=")
 
 
+def json_loads(data: bytes | str) -> tp.Any:
+    """Parse JSON with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def format_list(data: list[str]) -> str:
     return "- " + "\n- ".join(data)
 
 
 def dedent(text: str) -> str:
-    return textwrap.dedent(text).strip()
+    # textwrap.dedent without its regex passes: [ \t]-only lines are emptied and the
+    # common [ \t] margin of the remaining lines is sliced off
+    lines = [line if line.strip(" \t") else "" for line in text.split("\n")]
+    margin = os.path.commonprefix(
+        [line[: len(line) - len(line.lstrip(" \t"))] for line in lines if line]
+    )
+    if margin:
+        lines = [line[len(margin) :] for line in lines]
+    return "\n".join(lines).strip()
 
 
 def indent(text: str, spaces: int = 4, dedent_: bool = True) -> str:
     if dedent_:
         text = dedent(text)
-    return textwrap.indent(text, " " * spaces)
+    prefix = " " * spaces
+    # Same result as textwrap.indent, without its per-line predicate call
+    return "".join(
+        line if line.isspace() else prefix + line for line in text.splitlines(True)
+    )
 
 
 def generate_token() -> str:
     return secrets.token_hex(16)
 
 
+def _live_lines(stream: tp.IO[str]) -> tp.Iterator[str]:
+    """Yield output lines as soon as they reach the pipe, splitting on \r too"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    # read1() returns what is already in the pipe instead of waiting for a full chunk
+    while chunk := stream.buffer.read1(4096):  # type: ignore[attr-defined]
+        text = (pending + decoder.decode(chunk)).replace("\r", "\n")
+        *lines, pending = text.split("\n")
+        yield from lines
+    yield pending + decoder.decode(b"", final=True)
+
+
 def run_process(
     command: list[str],
     input_: str | None = None,
@@ -281,14 +324,12 @@ def run_process(
     )
     stdout_live = ""
     if live_output:
-        # ffmpeg writes progress with \r (not \n), so readline() blocks until
-        # the pipe buffer fills. Read in chunks to keep the pipe drained.
-        while chunk := process.stdout.read(4096):  # type: ignore
-            for line in chunk.replace("\r", "\n").splitlines():
-                line = line.strip()
-                if line:
-                    echo.print(line)
-                    stdout_live += line + "\n"
+        # ffmpeg writes progress with \r (not \n), so readline() would block
+        for line in _live_lines(process.stdout):  # type: ignore[arg-type]
+            line = line.strip()
+            if line:
+                echo.print(line)
+                stdout_live += line + "\n"
     try:
         stdout = process.communicate(
             input=input_ if input_ else None,
@@ -308,7 +349,9 @@ def run_process(
     )
 
 
+@functools.cache
 def _get_sudo_password() -> str:
+    """Asked once per process, every sudo command is still printed before it runs"""
     return prompt("Enter your sudo password", hide_input=True).strip()
 
 
@@ -317,13 +360,58 @@ def print_sudo_warning() -> None:
     echo.printc("This command requires sudo access", color="yellow")
 
 
+_DETECT_CHUNK_SIZE = 64 * 1024
+
+
+@functools.cache
+def _chardet() -> types.ModuleType:
+    """Detector module, imported on the first non-UTF-8 file only"""
+    try:
+        import cchardet  # optional C detector, its close() returns None, use .result
+
+        return cchardet
+    except ImportError:
+        import chardet
+
+        return chardet
+
+
 def detect_encoding(file_path: Path) -> str:
+    stat = os.stat(file_path)
+    return _detect_encoding(Path(file_path).resolve(), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=256)
+def _detect_encoding(file_path: Path, size: int, mtime_ns: int) -> str:
+    """Detected once per file version, a rewrite changes size or mtime"""
     with open(file_path, "rb") as f:
-        result = chardet.detect(f.read())
-    encoding = result["encoding"]
+        # Most subtitles are already UTF-8 (or ASCII), validating is far cheaper than
+        # scoring. A UTF-8 BOM is left to the detector, which reports "utf-8-sig"
+        if f.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+            f.seek(0)
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            try:
+                while chunk := f.read(_DETECT_CHUNK_SIZE):
+                    decoder.decode(chunk)
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                pass
+            else:
+                return "utf-8"
+        f.seek(0)
+        detector = _chardet().UniversalDetector()
+        # The detector settles on a BOM or a confident guess early, stop reading then
+        while not detector.done and (chunk := f.read(_DETECT_CHUNK_SIZE)):
+            detector.feed(chunk)
+    detector.close()
+    encoding = detector.result["encoding"]
     if encoding is None:
         raise ValueError(f"Could not detect encoding for {file_path}")
-    return encoding
+    try:
+        # Canonical codec name, chardet says "utf-8" where cchardet says "UTF-8"
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return encoding
 
 
 def get_sudo_pass(for_which_command: list[str], what_happens: str) -> str:
@@ -333,19 +421,36 @@ def get_sudo_pass(for_which_command: list[str], what_happens: str) -> str:
     return _get_sudo_password()
 
 
+def run_sudo(
+    command: list[str], what_happens: str, exit_on_error: bool = True
+) -> subprocess.CompletedProcess:
+    """Run a ``sudo -S`` command, a failed run forgets the password so it is asked again"""
+    password = get_sudo_pass(command, what_happens=what_happens)
+    try:
+        process = run_process(command, exit_on_error=exit_on_error, input_=password)
+    except ValueError:
+        _get_sudo_password.cache_clear()
+        raise
+    if process.returncode != 0:
+        _get_sudo_password.cache_clear()
+    return process
+
+
+_DURATION_RE = re.compile(r"(\d+):(\d+):(\d+)(?:\.(\d+))?")
+
+
 def parse_duration(duration: str) -> dt.timedelta:
     """01:42:18.05"""
-    parts = duration.split(":")
-    if "." in parts[-1]:
-        _seconds, milliseconds = parts[-1].split(".")
-        parts[-1] = _seconds
-        milliseconds_i = int(milliseconds)
-    else:
-        milliseconds_i = 0
-    parts_float = list(map(float, parts))
-    hours, minutes, seconds = parts_float
+    match = _DURATION_RE.fullmatch(duration)
+    if match is None:
+        raise ValueError(f"Invalid duration: {duration}")
+    hours, minutes, seconds, fraction = match.groups()
     return dt.timedelta(
-        hours=hours, minutes=minutes, seconds=seconds, milliseconds=milliseconds_i
+        hours=int(hours),
+        minutes=int(minutes),
+        seconds=int(seconds),
+        # ".05" is a decimal fraction of a second (50 ms), not a millisecond count
+        microseconds=int(fraction.ljust(6, "0")[:6]) if fraction else 0,
     )
 
 
@@ -370,8 +475,7 @@ class Config:
         if not path.exists():
             return Config()
         echo.debug(f"Loading configuration from {path}")
-        with open(path) as file:
-            data = json.load(file)
+        data = json_loads(path.read_bytes())
         data["media_dir"] = Path(data["media_dir"]) if data["media_dir"] else None
         return Config(**data)
 
@@ -380,13 +484,11 @@ class Config:
         echo.debug(f"Saving configuration to {path}")
         if not path.parent.exists():
             path.parent.mkdir(parents=True)
-        echo.debug(f"Saving configuration to {path}")
-        with open(path, "w") as file:
-            d = dataclasses.asdict(self)
-            d["media_dir"] = d["media_dir"].as_posix() if d["media_dir"] else None
-            json.dump(d, file, indent=4)
+        # Serialize in one C-encoder pass and write once, json.dump writes per chunk
+        path.write_text(json.dumps(self.to_dict(), indent=4))
 
     def to_dict(self) -> dict:
-        d = dataclasses.asdict(self)
-        d["media_dir"] = d["media_dir"].as_posix() if d["media_dir"] else None
+        # All fields are scalars, asdict's recursive copy is not needed
+        d = {field.name: getattr(self, field.name) for field in dataclasses.fields(self)}
+        d["media_dir"] = self.media_dir.as_posix() if self.media_dir else None
         return d
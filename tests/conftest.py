@@ -12,12 +12,16 @@ def reset_config():
     original_json_output = config.JSON_OUTPUT
     original_overwrite_default = config.OVERWRITE_DEFAULT
     original_log_level = config.LOG_LEVEL
+    original_probe_cache = config.PROBE_CACHE
+    original_plex_cache_ttl = config.PLEX_CACHE_TTL
 
     # Reset to defaults
     config.NON_INTERACTIVE = False
     config.JSON_OUTPUT = False
     config.OVERWRITE_DEFAULT = False
     config.LOG_LEVEL = "info"
+    config.PROBE_CACHE = False
+    config.PLEX_CACHE_TTL = 0
 
     yield
 
@@ -26,3 +30,5 @@ def reset_config():
     config.JSON_OUTPUT = original_json_output
     config.OVERWRITE_DEFAULT = original_overwrite_default
     config.LOG_LEVEL = original_log_level
+    config.PROBE_CACHE = original_probe_cache
+    config.PLEX_CACHE_TTL = original_plex_cache_ttl
@@ -99,6 +99,35 @@ class TestCLI:
         assert "--media-dir" in result.stdout or "media-dir" in result.stdout
         assert "--port" in result.stdout
 
+    @patch("browser_stream.cli.Nginx")
+    @patch("browser_stream.cli.FS")
+    @patch("browser_stream.cli.conf")
+    def test_nginx_command_saves_config_once(
+        self, mock_conf, mock_fs_class, mock_nginx_class, tmp_path
+    ):
+        """Test a renamed site config is persisted with a single save"""
+        mock_conf.nginx_conf_name = "old_name"
+        mock_conf.nginx_secret = "secret"
+        mock_nginx_class.return_value.get_browser_stream_config.return_value = "server {}"
+
+        result = self.runner.invoke(
+            app,
+            [
+                "setup",
+                "nginx",
+                "--media-dir",
+                str(tmp_path),
+                "--ipv4",
+                "--no-ssl",
+                "--site-conf-name",
+                "new_name",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        assert mock_conf.nginx_conf_name == "new_name"
+        mock_conf.save.assert_called_once()
+
     def test_no_args_shows_help(self):
         """Test that running with no args shows help"""
         result = self.runner.invoke(app, [])
@@ -1,6 +1,8 @@
 """Smoke tests for CLI commands using CliRunner and mocked Ffmpeg."""
 
 import json
+import subprocess
+import sys
 import tempfile
 from pathlib import Path
 from unittest.mock import MagicMock, patch
@@ -378,3 +380,47 @@ class TestExitCodes:
             output = json.loads(result.stdout)
             assert output["error"]
             assert output["command"] == "media extract-audio"
+
+    def test_stream_inline_subs_requires_nginx(self, runner, temp_video_file):
+        """Test --inline-subs is rejected for the Plex server"""
+        with patch("browser_stream.cli.stream_plex") as mock_stream_plex:
+            result = runner.invoke(
+                app,
+                ["stream", str(temp_video_file), "--server", "plex", "--inline-subs"],
+            )
+
+        assert result.exit_code == 1
+        mock_stream_plex.assert_not_called()
+
+    def test_stream_directory_yes_never_confirms(self, runner, tmp_path):
+        """Test --yes on a TV show directory answers the batch prompt"""
+        for i in (1, 2):
+            (tmp_path / f"Show.S01E0{i}.mkv").touch()
+
+        with (
+            patch("browser_stream.utils.confirm", side_effect=AssertionError),
+            patch(
+                "browser_stream.utils.select_options_interactive", return_value=(0, "")
+            ),
+            patch("browser_stream.cli.batch_prepare_episodes") as mock_batch,
+        ):
+            result = runner.invoke(
+                app, ["stream", str(tmp_path), "--prepare-only", "--yes"]
+            )
+
+        assert result.exit_code == 0, result.output
+        assert mock_batch.call_args.kwargs["assume_yes"] is True
+
+
+class TestStartup:
+    """Test CLI import cost"""
+
+    @pytest.mark.parametrize("module", ["httpx", "rich.table", "rich.logging", "chardet"])
+    def test_cli_import_skips_heavy_module(self, module):
+        """Test heavy modules are imported by the code paths that use them"""
+        code = f"import sys, browser_stream.cli; print({module!r} in sys.modules)"
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "False"
@@ -7,12 +7,23 @@ from browser_stream import (
     BatchProcessingInfo,
     BatchProcessingSettings,
     StreamMedia,
+    _ask,
     build_stream_url_nginx,
     build_stream_url_plex,
+    get_aac_audio_path,
+    get_media_stream_path,
     is_tv_show_directory,
+    prepare_file_to_stream,
     select_video,
 )
-from browser_stream.helpers import Exit
+from browser_stream.helpers import (
+    FS,
+    Exit,
+    Ffmpeg,
+    FfmpegMediaInfo,
+    FfmpegStream,
+    PlexAPI,
+)
 
 
 class TestStreamUrlBuilding:
@@ -65,25 +76,25 @@ class TestStreamUrlBuilding:
 
         assert "Nginx domain name not found" in exc_info.value.message
 
-    @patch("browser_stream.PlexAPI")
     @patch("browser_stream.conf")
-    def test_build_stream_url_plex_success(self, mock_conf, mock_plex_api):
-        """Test successful plex URL building"""
-        mock_conf.plex_x_token = "plex_token"
+    def test_build_stream_url_plex_success(self, mock_conf):
+        """Test plex URL building encodes the token exactly once"""
+        mock_conf.plex_x_token = "ab+c/d="
         mock_conf.host_url = "http://localhost:32400"
         mock_conf.plex_server_id = "server123"
 
-        mock_plex_instance = MagicMock()
-        mock_plex_instance.get_stream_url.return_value = "http://plex.example.com/stream"
-        mock_plex_api.return_value = mock_plex_instance
-
         media_file = Path("/media/videos/movie.mp4")
 
-        with patch("browser_stream.utils.url_encode", return_value="encoded_url"):
+        with patch.object(
+            PlexAPI, "get_library_id_by_path", return_value="123"
+        ) as mock_lookup:
             result = build_stream_url_plex(media_file)
 
-        assert result == "encoded_url"
-        mock_plex_instance.get_stream_url.assert_called_once_with(media_file)
+        assert result.startswith("http://localhost:32400/")
+        assert result.endswith(
+            "/library/metadata/123/media/0/file.mkv?X-Plex-Token=ab%2Bc%2Fd%3D"
+        )
+        mock_lookup.assert_called_once_with(media_file)
 
     @patch("browser_stream.conf")
     def test_build_stream_url_plex_missing_token(self, mock_conf):
@@ -335,3 +346,123 @@ class TestDataClasses:
         assert stream_media.subtitles_burned is False
         assert stream_media.subtitle_path is None
         assert stream_media.subtitle_lang is None
+
+
+class TestAssumeYes:
+    """Test --yes fast path for confirmation prompts"""
+
+    @patch("browser_stream.utils.confirm")
+    def test_ask_assume_yes_skips_prompt(self, mock_confirm):
+        """Test _ask returns True without prompting when assume_yes is set"""
+        assert _ask("Overwrite?", assume_yes=True) is True
+        mock_confirm.assert_not_called()
+
+    @patch("browser_stream.utils.confirm", return_value=False)
+    def test_ask_delegates_to_confirm(self, mock_confirm):
+        """Test _ask falls back to interactive confirm"""
+        assert _ask("Overwrite?") is False
+        mock_confirm.assert_called_once_with("Overwrite?")
+
+    def test_prepare_file_to_stream_assume_yes_never_confirms(self, tmp_path):
+        """Test --yes answers every overwrite/convert prompt on the stream path"""
+        media_file = tmp_path / "movie.mkv"
+        media_file.touch()
+        media_info = FfmpegMediaInfo(
+            filename=Path(media_file.name),
+            title="Movie",
+            bitrate="",
+            duration=None,
+            streams=[
+                FfmpegStream(index=0, type="video", codec="h264"),
+                FfmpegStream(index=1, type="audio", codec="ac3", language="eng"),
+                FfmpegStream(index=2, type="subtitle", codec="subrip", language="eng"),
+            ],
+        )
+        audio_aac = get_aac_audio_path(media_file, "eng")
+        subtitle_file = tmp_path / "movie.en.srt"
+        vtt_file = tmp_path / "movie.en.vtt"
+        for path in (audio_aac, subtitle_file, vtt_file):
+            path.touch()
+        get_media_stream_path(media_file, language="eng").touch()
+
+        with (
+            patch("browser_stream.utils.confirm", side_effect=AssertionError),
+            patch(
+                "browser_stream.utils.select_options_interactive", return_value=(0, "")
+            ),
+            patch.object(Ffmpeg, "get_media_info", return_value=media_info),
+            patch.object(Ffmpeg, "print_media_info"),
+            patch.object(Ffmpeg, "_run"),
+            patch.object(Ffmpeg, "convert_to_mp4") as mock_convert,
+            patch.object(FS, "enforce_utf8", side_effect=lambda path: path),
+            patch("browser_stream.get_matched_media_stream_mp4", return_value=None),
+        ):
+            stream_media = prepare_file_to_stream(
+                media_file,
+                audio_lang="eng",
+                subtitle_lang="eng",
+                no_scan=True,
+                assume_yes=True,
+            )
+
+        assert mock_convert.call_args.kwargs["audio_file"] == audio_aac
+        assert not subtitle_file.exists()  # overwritten by extract_subtitle
+        assert stream_media.subtitle_path == vtt_file
+
+
+class TestPrepareSubtitles:
+    """Test subtitle handling in prepare_file_to_stream"""
+
+    def test_extracted_subtitle_served_without_second_conversion(self, tmp_path):
+        """Test the WebVTT copy from extraction is used without a prompt or rerun"""
+        media_file = tmp_path / "movie.mkv"
+        media_file.touch()
+        media_info = FfmpegMediaInfo(
+            filename=Path(media_file.name),
+            title="Movie",
+            bitrate="",
+            duration=None,
+            streams=[
+                FfmpegStream(index=0, type="video", codec="h264"),
+                FfmpegStream(index=1, type="audio", codec="aac", language="eng"),
+                FfmpegStream(index=2, type="subtitle", codec="subrip", language="eng"),
+            ],
+        )
+        vtt_file = tmp_path / "movie.en.vtt"
+
+        def confirm(message):
+            assert message == "Select subtitles?"
+            return True
+
+        with (
+            patch("browser_stream.utils.confirm", side_effect=confirm),
+            patch(
+                "browser_stream.utils.select_options_interactive", return_value=(0, "")
+            ),
+            patch.object(Ffmpeg, "get_media_info", return_value=media_info),
+            patch.object(Ffmpeg, "print_media_info"),
+            patch.object(Ffmpeg, "_run", side_effect=lambda *a, **k: vtt_file.touch()),
+            patch.object(Ffmpeg, "convert_to_mp4"),
+            patch.object(Ffmpeg, "convert_subtitle_to_vtt") as mock_to_vtt,
+            patch.object(FS, "enforce_utf8", side_effect=lambda path: path),
+            patch("browser_stream.get_matched_media_stream_mp4", return_value=None),
+        ):
+            stream_media = prepare_file_to_stream(media_file, no_scan=True)
+
+        assert stream_media.subtitle_path == vtt_file
+        mock_to_vtt.assert_not_called()
+
+    @pytest.mark.parametrize("option", ["burn_subtitles", "add_subtitles_to_mp4"])
+    def test_no_webvtt_copy_for_burned_or_embedded_subtitles(self, option):
+        """Test no WebVTT side file is requested when nothing will serve it"""
+        with (
+            patch.object(Ffmpeg, "print_media_info"),
+            patch("browser_stream.select_audio", return_value=(Path("a.aac"), "eng")),
+            patch(
+                "browser_stream.select_subtitle", return_value=(None, None)
+            ) as mock_select,
+            pytest.raises(Exit),
+        ):
+            prepare_file_to_stream(Path("movie.mkv"), **{option: True})
+
+        assert mock_select.call_args.kwargs["webvtt"] is False
@@ -0,0 +1,101 @@
+import importlib
+import io
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from browser_stream.echo import Echo, log, setup_logger
+
+# `browser_stream.echo` the attribute is the Echo instance, fetch the module itself
+echo_module = importlib.import_module("browser_stream.echo")
+
+
+class _TTY(io.StringIO):
+    def isatty(self) -> bool:
+        return True
+
+
+class TestEcho:
+    """Test Echo console helpers"""
+
+    def test_clear_line_skipped_when_not_a_tty(self):
+        """Test no padding is written to redirected stderr"""
+        stderr = io.StringIO()
+        with patch("sys.stderr", stderr):
+            Echo().clear_line()
+
+        assert stderr.getvalue() == ""
+
+    def test_clear_line_on_tty(self):
+        """Test the line is blanked and the cursor returned on a terminal"""
+        stderr = _TTY()
+        with patch("sys.stderr", stderr):
+            Echo().clear_line()
+
+        assert stderr.getvalue() == " " * 50 + "\r"
+
+    def test_printc_plain_when_not_a_tty(self):
+        """Test colors are only added for a terminal"""
+        for stderr, expected in (
+            (io.StringIO(), "Error\n"),
+            (_TTY(), "\x1b[31m\x1b[1mError\x1b[0m\n"),
+        ):
+            with patch("sys.stderr", stderr):
+                Echo().printc("Error", color="red", bold=True)
+
+            assert stderr.getvalue().endswith(expected)
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_print_json(self, use_orjson, capsys):
+        """Test JSON output is indented and keeps non-ASCII text as is"""
+        if use_orjson:
+            pytest.importorskip("orjson")
+        with patch.object(
+            echo_module, "orjson", echo_module.orjson if use_orjson else None
+        ):
+            Echo().print_json({"title": "Амели", "streams": [1]})
+
+        assert capsys.readouterr().out == (
+            '{\n  "title": "Амели",\n  "streams": [\n    1\n  ]\n}\n'
+        )
+
+
+class TestLog:
+    """Test the log decorator"""
+
+    def test_debug_log_not_wrapped_without_debug(self, monkeypatch):
+        """Test debug-only spinners return the function itself when DEBUG is off"""
+        monkeypatch.setattr(echo_module.config, "DEBUG", False)
+
+        def fn():
+            return 1
+
+        assert log("Working", debug=True)(fn) is fn
+        assert log("Working")(fn) is not fn
+
+    def test_spinner_skipped_in_json_mode(self, monkeypatch):
+        """Test JSON mode set after decoration still suppresses the spinner"""
+        wrapped = log("Working")(lambda: 1)
+        monkeypatch.setattr(echo_module.config, "JSON_OUTPUT", True)
+
+        with patch.object(echo_module.echo, "printc") as mock_printc:
+            assert wrapped() == 1
+
+        mock_printc.assert_not_called()
+
+
+class TestSetupLogger:
+    """Test logger configuration"""
+
+    def test_setup_logger_reuses_handler(self):
+        """Test repeated setup keeps one handler and only updates the level"""
+        logger = logging.getLogger("browser_stream")
+
+        setup_logger("debug")
+        handler = logger.handlers[0]
+        setup_logger("error")
+
+        assert logger.handlers == [handler]
+        assert handler.level == logging.ERROR
+        assert logger.level == logging.ERROR
@@ -1,9 +1,24 @@
+import dataclasses
+import hashlib
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import httpx
 import pytest
 
-from browser_stream.helpers import Exit, PlexAPI, exit_if
+import browser_stream.config as config
+from browser_stream.helpers import (
+    FS,
+    HTML,
+    Exit,
+    Ffmpeg,
+    FfmpegMediaInfo,
+    FfmpegStream,
+    Nginx,
+    PlexAPI,
+    ProbeCache,
+    exit_if,
+)
 
 
 class TestExit:
@@ -68,6 +83,10 @@ class TestExitIf:
         assert exc_info.value.code == 99
 
 
+def _plex_title(rating_key: str, file: str) -> dict:
+    return {"ratingKey": rating_key, "Media": [{"Part": [{"file": file}]}]}
+
+
 class TestPlexAPI:
     """Test PlexAPI class functionality"""
 
@@ -110,6 +129,14 @@ class TestPlexAPI:
         expected = "http://localhost:32400/library/metadata/123?X-Plex-Token=test_token"
         assert result == expected
 
+    def test_get_direct_url_token_is_query_encoded(self):
+        """Test token query is built once and URL-encoded"""
+        plex = PlexAPI("a+b/c", server_id="server123")
+
+        result = plex.get_direct_url("library/metadata/123")
+
+        assert result.endswith("?X-Plex-Token=a%2Bb%2Fc")
+
     def test_get_direct_url_no_server_id(self):
         """Test get_direct_url fails without server ID"""
         plex = PlexAPI("test_token")  # No server_id
@@ -129,11 +156,11 @@ class TestPlexAPI:
         assert " " not in result
         assert result != test_url  # Should be different
 
-    @patch("httpx.request")
+    @patch("httpx.Client.request")
     def test_request_get_success(self, mock_request):
         """Test successful GET request"""
         mock_response = MagicMock()
-        mock_response.json.return_value = {"test": "data"}
+        mock_response.content = b'{"test": "data"}'
         mock_response.raise_for_status.return_value = None
         mock_request.return_value = mock_response
 
@@ -145,10 +172,24 @@ class TestPlexAPI:
         call_args = mock_request.call_args
         assert call_args[0][0] == "GET"  # method
         assert "test/path" in call_args[0][1]  # url
-        assert call_args[1]["params"]["X-Plex-Token"] == "test_token"
         assert call_args[1]["params"]["param"] == "value"
+        assert plex._client.params["X-Plex-Token"] == "test_token"
 
-    @patch("httpx.request")
+    @patch("httpx.Client.request")
+    def test_request_reuses_client(self, mock_request):
+        """Test requests share one pooled client until closed"""
+        mock_request.return_value = MagicMock(content=b"{}")
+
+        with PlexAPI("test_token") as plex:
+            plex._request("GET", "/one")
+            client = plex._client
+            plex._request("GET", "/two")
+            assert plex._client is client
+            assert str(client.base_url) == "http://localhost:32400"
+
+        assert client.is_closed
+
+    @patch("httpx.Client.request")
     def test_request_http_error(self, mock_request):
         """Test request with HTTP error"""
         mock_response = MagicMock()
@@ -162,11 +203,11 @@ class TestPlexAPI:
         with pytest.raises(httpx.HTTPStatusError):
             plex._request("GET", "/nonexistent")
 
-    @patch("httpx.request")
+    @patch("httpx.Client.request")
     def test_get_method(self, mock_request):
         """Test _get convenience method"""
         mock_response = MagicMock()
-        mock_response.json.return_value = {"result": "success"}
+        mock_response.content = b'{"result": "success"}'
         mock_response.raise_for_status.return_value = None
         mock_request.return_value = mock_response
 
@@ -186,7 +227,100 @@ class TestPlexAPI:
         result = plex.get_libraries()
 
         assert result == {"libraries": []}
-        mock_get.assert_called_once_with("/library/sections")
+        mock_get.assert_called_once_with("/library/sections", None)
+
+    @patch("browser_stream.helpers.PlexAPI._get")
+    def test_get_libraries_cached(self, mock_get):
+        """Test repeated library lookups hit the network once"""
+        mock_get.return_value = {"MediaContainer": {"Directory": []}}
+
+        plex = PlexAPI("test_token")
+        plex.get_libraries()
+        plex.get_libraries()
+        plex.get_library("1")
+        plex.get_library("1")
+
+        assert mock_get.call_count == 2
+
+    @patch("browser_stream.helpers.PlexAPI._get")
+    def test_library_disk_cache_shared_between_instances(
+        self, mock_get, tmp_path, monkeypatch
+    ):
+        """Test a fresh instance reuses library responses persisted within the TTL"""
+        monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(config, "PLEX_CACHE_TTL", 300)
+        mock_get.return_value = {"MediaContainer": {"size": 1}}
+
+        PlexAPI("test_token").get_library("1")
+        assert PlexAPI("test_token").get_library("1") == {"size": 1}
+        mock_get.assert_called_once()
+
+        monkeypatch.setattr(config, "PLEX_CACHE_TTL", 0)
+        PlexAPI("test_token").get_library("1")
+        assert mock_get.call_count == 2
+
+    @pytest.mark.parametrize(
+        "content", ["[]", '{"/library/sections/1/all": {"data": {}}}', '{"a": 1}', "{"]
+    )
+    @patch("browser_stream.helpers.PlexAPI._get")
+    def test_malformed_disk_cache_ignored(self, mock_get, content, tmp_path, monkeypatch):
+        """Test a disk cache of the wrong shape is treated as empty"""
+        monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(config, "PLEX_CACHE_TTL", 300)
+        mock_get.return_value = {"MediaContainer": {"size": 1}}
+        plex = PlexAPI("test_token")
+        plex._disk_cache_path.parent.mkdir(parents=True)
+        plex._disk_cache_path.write_text(content)
+
+        assert plex.get_library("1") == {"size": 1}
+        mock_get.assert_called_once()
+
+    @patch("browser_stream.helpers.PlexAPI._get")
+    def test_disk_cached_library_refetched_for_new_file(
+        self, mock_get, tmp_path, monkeypatch
+    ):
+        """Test a file missing from a disk-cached section triggers one refetch"""
+        monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(config, "PLEX_CACHE_TTL", 300)
+        mock_get.return_value = {
+            "MediaContainer": {"Metadata": [_plex_title("10", "/media/a.mp4")]}
+        }
+        PlexAPI("test_token").get_library("1")
+        mock_get.return_value = {
+            "MediaContainer": {
+                "Metadata": [
+                    _plex_title("10", "/media/a.mp4"),
+                    _plex_title("20", "/media/b.mp4"),
+                ]
+            }
+        }
+
+        plex = PlexAPI("test_token")
+
+        assert plex._get_media_key_from_directory("1", Path("/media/b.mp4")) == "20"
+        assert mock_get.call_count == 2
+        assert PlexAPI("test_token").get_library("1")["Metadata"][1]["ratingKey"] == "20"
+
+    @patch("browser_stream.helpers.PlexAPI._get")
+    def test_disk_cached_sections_refetched_for_new_location(
+        self, mock_get, tmp_path, monkeypatch
+    ):
+        """Test a path outside the disk-cached locations triggers one refetch"""
+        monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(config, "PLEX_CACHE_TTL", 300)
+        movies = {"key": "1", "Location": [{"path": "/movies"}]}
+        tv = {"key": "2", "Location": [{"path": "/tv"}]}
+        mock_get.return_value = {"MediaContainer": {"Directory": [movies]}}
+        PlexAPI("test_token").get_libraries()
+        mock_get.return_value = {"MediaContainer": {"Directory": [movies, tv]}}
+
+        plex = PlexAPI("test_token")
+
+        assert plex._get_directory_matched_prefix("/tv/show.mkv") == tv
+        assert mock_get.call_count == 2
+        with pytest.raises(Exit):
+            plex._get_directory_matched_prefix("/other/c.mp4")
+        assert mock_get.call_count == 2
 
     @patch("browser_stream.helpers.PlexAPI._get")
     def test_get_library(self, mock_get):
@@ -197,7 +331,10 @@ class TestPlexAPI:
         result = plex.get_library("123")
 
         assert result == {"items": []}
-        mock_get.assert_called_once_with("/library/sections/123/all")
+        mock_get.assert_called_once_with(
+            "/library/sections/123/all", PlexAPI._LIBRARY_PARAMS
+        )
+        assert "summary" in PlexAPI._LIBRARY_PARAMS["excludeFields"]
 
     @patch("browser_stream.helpers.PlexAPI._get")
     def test_get_metadata(self, mock_get):
@@ -223,13 +360,137 @@ class TestPlexAPI:
         assert result == expected_response
         mock_get.assert_called_once_with("/library/metadata/789/children")
 
+    @patch("browser_stream.helpers.PlexAPI.get_library")
+    def test_get_media_key_from_directory(self, mock_get_library):
+        """Test path lookup uses an index built once per section"""
+        mock_get_library.return_value = {
+            "Metadata": [
+                {"ratingKey": "10", "Media": [{"Part": [{"file": "/media/a.mp4"}]}]},
+                {
+                    "ratingKey": "20",
+                    "Media": [
+                        {"Part": [{"file": "/media/b.mp4"}, {"file": "/media/c.mp4"}]}
+                    ],
+                },
+            ]
+        }
+
+        plex = PlexAPI("test_token")
+
+        assert plex._get_media_key_from_directory("1", Path("/media/c.mp4")) == "20"
+        assert plex._get_media_key_from_directory("1", Path("/media/a.mp4")) == "10"
+        with pytest.raises(Exit) as exc_info:
+            plex._get_media_key_from_directory("1", Path("/media/missing.mp4"))
+        assert "No media found" in exc_info.value.message
+        mock_get_library.assert_called_once_with("1")
+
+    @patch("browser_stream.helpers.PlexAPI.get_library")
+    def test_get_media_key_normalizes_slashes(self, mock_get_library):
+        """Test Plex file paths and lookup paths compare after normalization"""
+        mock_get_library.return_value = {
+            "Metadata": [_plex_title("10", "/media//shows/a.mp4")]
+        }
+
+        plex = PlexAPI("test_token")
+
+        assert plex._get_media_key_from_directory("1", "/media/shows//a.mp4/") == "10"
+
+    @patch("browser_stream.helpers.PlexAPI.get_library")
+    @patch("browser_stream.helpers.PlexAPI.get_libraries")
+    def test_get_library_id_by_path(self, mock_get_libraries, mock_get_library):
+        """Test the media ratingKey is returned, not just looked up"""
+        mock_get_libraries.return_value = {
+            "Directory": [{"key": "1", "Location": [{"path": "/media"}]}]
+        }
+        mock_get_library.return_value = {"Metadata": [_plex_title("10", "/media/a.mp4")]}
+
+        plex = PlexAPI("test_token")
+
+        assert plex.get_library_id_by_path(Path("/media/a.mp4")) == "10"
+        mock_get_library.assert_called_once_with("1")
+
+    @patch("browser_stream.helpers.PlexAPI.get_libraries")
+    def test_get_directory_matched_prefix_longest_first(self, mock_get_libraries):
+        """Test nested library locations resolve to the most specific one"""
+        mock_get_libraries.return_value = {
+            "Directory": [
+                {"key": "1", "Location": [{"path": "/media"}]},
+                {"key": "2", "Location": [{"path": "/media/tv"}]},
+            ]
+        }
+
+        plex = PlexAPI("test_token")
+
+        assert plex._get_directory_matched_prefix(Path("/media/tv/a.mp4"))["key"] == "2"
+        assert plex._get_directory_matched_prefix(Path("/media/b.mp4"))["key"] == "1"
+        with pytest.raises(Exit) as exc_info:
+            plex._get_directory_matched_prefix(Path("/other/c.mp4"))
+        assert "- /media/tv" in exc_info.value.message
+        mock_get_libraries.assert_called_once()
+
+    def test_get_stream_urls_prefetches_sections_concurrently(
+        self, tmp_path, monkeypatch
+    ):
+        """Test libraries of different sections are fetched in one async batch"""
+        monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path))
+        monkeypatch.setattr(config, "PLEX_CACHE_TTL", 300)
+        libraries = {
+            "1": {"MediaContainer": {"Metadata": [_plex_title("10", "/movies/a.mp4")]}},
+            "2": {"MediaContainer": {"Metadata": [_plex_title("20", "/tv/b.mp4")]}},
+        }
+
+        async def fake_get(self, url, **kwargs):
+            key = url.split("/")[2]
+            return httpx.Response(
+                200, json=libraries[key], request=httpx.Request("GET", url)
+            )
+
+        plex = PlexAPI("test_token", server_id="server123")
+        plex._cache["/library/sections"] = {
+            "MediaContainer": {
+                "Directory": [
+                    {"key": "1", "Location": [{"path": "/movies"}]},
+                    {"key": "2", "Location": [{"path": "/tv"}]},
+                ]
+            }
+        }
+        with (
+            patch("httpx.AsyncClient.get", new=fake_get),
+            patch.object(PlexAPI, "_save_disk_cache") as mock_save,
+        ):
+            urls = plex.get_stream_urls([Path("/movies/a.mp4"), Path("/tv/b.mp4")])
+
+        assert "/library/metadata/10/" in urls[0]
+        assert "/library/metadata/20/" in urls[1]
+        mock_save.assert_called_once()
+
+    def test_do_scan_many(self):
+        """Test refreshes of several paths go out as one async batch"""
+        calls = []
+
+        async def fake_get(self, url, **kwargs):
+            calls.append((url, kwargs["params"]))
+            return httpx.Response(200, json={}, request=httpx.Request("GET", url))
+
+        plex = PlexAPI("test_token")
+        plex._cache["/library/sections/1/all"] = {"MediaContainer": {}}
+        with patch("httpx.AsyncClient.get", new=fake_get):
+            results = plex.do_scan_many([("1", "/movies/a"), ("2", None)])
+
+        assert results == [{}, {}]
+        assert calls == [
+            ("library/sections/1/refresh", {"path": "/movies/a"}),
+            ("library/sections/2/refresh", {}),
+        ]
+        assert "/library/sections/1/all" not in plex._cache
+
     def test_path_handling_leading_slash(self):
         """Test path handling strips leading slashes properly"""
         plex = PlexAPI("test_token", "http://example.com")
 
-        with patch("httpx.request") as mock_request:
+        with patch("httpx.Client.request") as mock_request:
             mock_response = MagicMock()
-            mock_response.json.return_value = {}
+            mock_response.content = b"{}"
             mock_response.raise_for_status.return_value = None
             mock_request.return_value = mock_response
 
@@ -241,3 +502,430 @@ class TestPlexAPI:
             calls = mock_request.call_args_list
             assert len(calls) == 2
             assert calls[0][0][1] == calls[1][0][1]  # Same URL
+
+
+class TestNginx:
+    """Test Nginx site config generation"""
+
+    def test_browser_stream_config(self):
+        """Test template values are filled and nginx variables kept verbatim"""
+        conf = Nginx().get_browser_stream_config(
+            Path("/media"), secret="s3cret", port=8080, ipv4=True, allow_index=True
+        )
+
+        assert conf.startswith("server {\n    listen 8080;\n\n    server_name _;")
+        assert 'alias "/media/";' in conf
+        assert "autoindex on;" in conf
+        assert 'set $secret "s3cret";' in conf
+        assert "if ($arg_x-token = $secret) {" in conf
+        assert "ssl_certificate" not in conf
+
+    def test_browser_stream_config_ssl(self):
+        """Test SSL listen flags and letsencrypt certificate paths"""
+        conf = Nginx().get_browser_stream_config(
+            Path("/media"), secret="s", ipv6=True, ssl=True, server_name="example.com"
+        )
+
+        assert "    listen [::]:32000 ssl;\n" in conf
+        assert (
+            "    ssl_certificate /etc/letsencrypt/live/example.com/fullchain.pem;\n"
+            "    ssl_certificate_key /etc/letsencrypt/live/example.com/privkey.pem;\n"
+        ) in conf
+
+    def test_browser_stream_config_ssl_requires_server_name(self):
+        """Test SSL without a server name is rejected"""
+        with pytest.raises(Exit, match="Server name is required"):
+            Nginx().get_browser_stream_config(Path("/media"), secret="s", ssl=True)
+
+
+class TestFfmpegExtractSubtitle:
+    """Test Ffmpeg.extract_subtitle argument building"""
+
+    @staticmethod
+    def _media_info(codec: str) -> FfmpegMediaInfo:
+        return FfmpegMediaInfo(
+            filename=Path("movie.mkv"),
+            title="Movie",
+            bitrate="",
+            duration=None,
+            streams=[
+                FfmpegStream(index=0, type="video", codec="h264"),
+                FfmpegStream(index=1, type="subtitle", codec=codec, language="eng"),
+            ],
+        )
+
+    def test_extract_text_subtitle_copies_stream(self, tmp_path):
+        """Test SRT subtitles are stream-copied with an explicit muxer"""
+        media_file = tmp_path / "movie.mkv"
+        with (
+            patch.object(
+                Ffmpeg, "get_media_info", return_value=self._media_info("subrip")
+            ),
+            patch.object(Ffmpeg, "_run") as mock_run,
+        ):
+            result = Ffmpeg().extract_subtitle(media_file, 1, "eng")
+
+        assert result == tmp_path / "movie.en.srt"
+        args = mock_run.call_args[0]
+        assert args[args.index("-c:s") + 1] == "copy"
+        assert args[args.index("-f") + 1] == "srt"
+
+    def test_extract_subtitle_with_webvtt_single_pass(self, tmp_path):
+        """Test the WebVTT copy is written by the same ffmpeg invocation"""
+        media_file = tmp_path / "movie.mkv"
+        with (
+            patch.object(
+                Ffmpeg, "get_media_info", return_value=self._media_info("subrip")
+            ),
+            patch.object(Ffmpeg, "_run") as mock_run,
+        ):
+            result = Ffmpeg().extract_subtitle(media_file, 1, "eng", webvtt=True)
+
+        assert result == tmp_path / "movie.en.vtt"
+        mock_run.assert_called_once()
+        args = mock_run.call_args[0]
+        assert args.count("-i") == 1
+        assert args[-1] == tmp_path / "movie.en.vtt"
+        assert args[args.index("webvtt") - 1] == "-c:s"
+
+    def test_extract_bitmap_subtitle_refused(self, tmp_path):
+        """Test bitmap subtitles are refused before running ffmpeg"""
+        media_file = tmp_path / "movie.mkv"
+        with (
+            patch.object(
+                Ffmpeg,
+                "get_media_info",
+                return_value=self._media_info("hdmv_pgs_subtitle"),
+            ),
+            patch.object(Ffmpeg, "_run") as mock_run,
+        ):
+            with pytest.raises(Exit) as exc_info:
+                Ffmpeg().extract_subtitle(media_file, 1, "eng")
+
+        assert "Bitmap subtitles" in exc_info.value.message
+        mock_run.assert_not_called()
+
+
+class TestFSGetFiles:
+    """Test FS directory scans"""
+
+    def test_get_video_files_matches_suffix(self, tmp_path):
+        """Test files are matched by suffix, case-insensitively, skipping dirs"""
+        for name in ("a.mkv", "b.MP4", "c.srt", ".hidden.mkv"):
+            (tmp_path / name).touch()
+        (tmp_path / "folder.mkv").mkdir()
+
+        files = sorted(f.name for f in FS.get_video_files(tmp_path, recursive_depth=0))
+
+        assert files == ["a.mkv", "b.MP4"]
+
+    def test_get_files_with_extensions_bare_extensions(self, tmp_path):
+        """Test callers pass bare extensions, as in the config sets"""
+        for name in ("a.srt", "b.ASS", "c.mkv", "srt"):
+            (tmp_path / name).touch()
+
+        files = FS.get_files_with_extensions(
+            tmp_path, extensions=config.SUBTITLE_EXTENSIONS, recursive_depth=0
+        )
+
+        assert sorted(f.name for f in files) == ["a.srt", "b.ASS"]
+
+    @pytest.mark.parametrize(
+        ("name", "expected"),
+        [("a.mkv", "mkv"), ("a.en.srt", "srt"), ("noext", ""), (".bashrc", "")],
+    )
+    def test_get_extension(self, name, expected):
+        """Test only the last suffix is returned, without the dot"""
+        assert FS.get_extension(Path(name)) == expected
+
+
+class TestFSEnforceUtf8:
+    """Test subtitle re-encoding"""
+
+    def test_enforce_utf8_converts_legacy_encoding(self, tmp_path):
+        """Test a cp1251 file is re-encoded next to the original"""
+        text = "1\n00:00:01,000 --> 00:00:02,000\nПривет, как дела?\n" * 100
+        path = tmp_path / "movie.ru.srt"
+        path.write_bytes(text.encode("cp1251"))
+
+        output = FS.enforce_utf8(path)
+
+        assert output == tmp_path / "movie.ru.utf8.srt"
+        assert output.read_text(encoding="utf-8") == text
+
+    def test_enforce_utf8_keeps_utf8_file(self, tmp_path):
+        """Test an UTF-8 file is returned as is"""
+        path = tmp_path / "movie.en.srt"
+        path.write_text("Hello", encoding="utf-8")
+
+        assert FS.enforce_utf8(path) == path
+
+
+class TestFSWriteFile:
+    """Test FS.write_file"""
+
+    def test_write_file_creates_file(self, tmp_path):
+        """Test write_file writes content with trailing newline"""
+        path = tmp_path / "video.html"
+
+        FS.write_file(path, "<video></video>")
+
+        assert path.read_text() == "<video></video>\n"
+
+    def test_write_file_skips_unchanged(self, tmp_path):
+        """Test write_file does not rewrite identical content"""
+        path = tmp_path / "video.html"
+        path.write_text("<video></video>\n")
+
+        with patch("browser_stream.helpers.utils.run_process") as mock_run:
+            FS.write_file(path, "<video></video>", sudo=True)
+
+        mock_run.assert_not_called()
+
+    def test_file_digest(self, tmp_path):
+        """Test file_digest matches hashing the content in one go"""
+        path = tmp_path / "site.conf"
+        path.write_bytes(b"server {}\n" * 5000)
+
+        assert FS.file_digest(path) == hashlib.sha256(b"server {}\n" * 5000).digest()
+
+
+class TestHTML:
+    """Test HTML generation"""
+
+    def test_get_video_html_with_subtitles(self):
+        """Test HTML template substitution"""
+        html = HTML.get_video_html_with_subtitles(
+            "https://host/video.mp4", "https://host/video.vtt", "english"
+        )
+
+        assert html.startswith("<video controls")
+        assert '<source src="https://host/video.mp4" type="video/mp4">' in html
+        assert 'srclang="en" label="English"' in html
+        assert html.endswith("</video>")
+
+    def test_get_video_html_with_inline_subtitles(self):
+        """Test subtitles are embedded as a base64 data URI"""
+        html = HTML.get_video_html_with_inline_subtitles(
+            "https://host/video.mp4", b"WEBVTT\n", "eng"
+        )
+
+        assert 'src="data:text/vtt;base64,V0VCVlRUCg=="' in html
+
+
+class TestFfmpegConvertToMp4:
+    """Test Ffmpeg.convert_to_mp4 argument building"""
+
+    def test_convert_with_external_audio_and_subtitles(self):
+        """Test inputs are indexed in order and paths passed through"""
+        with patch.object(Ffmpeg, "_run") as mock_run:
+            Ffmpeg().convert_to_mp4(
+                Path("/media/movie.mkv"),
+                Path("/media/movie.en.stream.mp4"),
+                audio_lang="eng",
+                audio_file=Path("/media/movie.aac"),
+                subtitle_file=Path("/media/movie.srt"),
+                subtitle_lang="rus",
+            )
+
+        args = [str(a) for a in mock_run.call_args[0]]
+        assert args[:6] == [
+            "-i",
+            "/media/movie.mkv",
+            "-i",
+            "/media/movie.aac",
+            "-i",
+            "/media/movie.srt",
+        ]
+        assert args[args.index("-c:v") + 1] == "copy"
+        assert "1:a:0" in args
+        assert "2:0" in args
+        assert args[-2:] == ["-y", "/media/movie.en.stream.mp4"]
+
+
+class TestFfmpegRun:
+    """Test Ffmpeg binary resolution"""
+
+    def test_run_resolves_binary_once(self):
+        """Test PATH is searched once and ffmpeg is run by absolute path"""
+        Ffmpeg._resolved.cache_clear()
+        with (
+            patch(
+                "browser_stream.helpers.shutil.which", return_value="/usr/bin/ffmpeg"
+            ) as mock_which,
+            patch("browser_stream.helpers.utils.run_process") as mock_run,
+        ):
+            Ffmpeg._run("-version")
+            Ffmpeg._run("-version")
+        Ffmpeg._resolved.cache_clear()
+
+        mock_which.assert_called_once_with("ffmpeg")
+        assert mock_run.call_args[0][0] == ["/usr/bin/ffmpeg", "-version"]
+
+
+class TestProbeCache:
+    """Test on-disk ffmpeg probe cache"""
+
+    def test_probe_cache_roundtrip(self, tmp_path):
+        """Test cached output survives a save/load cycle"""
+        media_file = tmp_path / "movie.mkv"
+        media_file.write_bytes(b"video")
+        cache_file = tmp_path / "cache" / "probe.json"
+
+        cache = ProbeCache(cache_file)
+        assert cache.get(media_file) is None
+        cache.set(media_file, "Stream #0:0: Video: h264")
+        cache.save()
+
+        assert ProbeCache(cache_file).get(media_file) == "Stream #0:0: Video: h264"
+
+    def test_probe_cache_invalidated_on_change(self, tmp_path):
+        """Test entry is stale once the file size changes"""
+        media_file = tmp_path / "movie.mkv"
+        media_file.write_bytes(b"video")
+        cache = ProbeCache(tmp_path / "probe.json")
+        cache.set(media_file, "output")
+
+        media_file.write_bytes(b"longer video")
+
+        assert cache.get(media_file) is None
+
+    def test_media_info_reprobed_after_rewrite(self, tmp_path):
+        """Test parsed media info is reused until the file changes"""
+        media_file = tmp_path / "movie.mkv"
+        media_file.write_bytes(b"video")
+        with patch.object(Ffmpeg, "probe_cached", return_value="") as mock_probe:
+            Ffmpeg.get_media_info(media_file)
+            Ffmpeg.get_media_info(media_file)
+            assert mock_probe.call_count == 1
+
+            media_file.write_bytes(b"converted video")
+            Ffmpeg.get_media_info(media_file)
+            assert mock_probe.call_count == 2
+
+    def test_probe_limits_input_read(self):
+        """Test probe flags are passed as input options before -i for remote URLs"""
+        url = "http://localhost:32400/library/parts/1/file.mkv"
+        with patch.object(Ffmpeg, "_run", return_value="output") as mock_run:
+            Ffmpeg.probe_cached(url)
+
+        args = mock_run.call_args[0]
+        assert args[: args.index("-i")] == ("-probesize", "1M", "-analyzeduration", "1M")
+
+    def test_probe_local_file_keeps_defaults(self, tmp_path):
+        """Test local files are probed without the remote input limits"""
+        media_file = tmp_path / "movie.mkv"
+        with patch.object(Ffmpeg, "_run", return_value="output") as mock_run:
+            Ffmpeg.probe_cached(media_file)
+
+        assert mock_run.call_args[0][0] == "-i"
+
+    def test_probe_cache_miss_on_other_flags(self, tmp_path):
+        """Test an entry probed with other limits is not served"""
+        media_file = tmp_path / "movie.mkv"
+        media_file.write_bytes(b"video")
+        cache = ProbeCache(tmp_path / "probe.json")
+        cache.set(media_file, "truncated", ["-probesize", "1M"])
+
+        assert cache.get(media_file) is None
+        assert cache.get(media_file, ["-probesize", "1M"]) == "truncated"
+
+
+class TestFfmpegRepackToMp4:
+    """Test Ffmpeg.repack_to_mp4 argument building"""
+
+    def test_repack_with_subtitle_output_single_run(self):
+        """Test SRT extraction is a second output of the same ffmpeg run"""
+        sub_stream = FfmpegStream(
+            index=3, type="subtitle", codec="subrip", language="eng"
+        )
+        with (
+            patch.object(Ffmpeg, "_needs_audio_transcode", return_value=False),
+            patch.object(Ffmpeg, "_run") as mock_run,
+        ):
+            Ffmpeg.repack_to_mp4(
+                Path("/media/movie.mkv"),
+                Path("/media/movie.mp4"),
+                audio_indices=[1],
+                extra_args=["-c:v", "copy"],
+                subtitle_stream=sub_stream,
+                subtitle_output=Path("/media/movie.srt"),
+            )
+
+        mock_run.assert_called_once()
+        args = [str(a) for a in mock_run.call_args[0]]
+        mp4_end = args.index("/media/movie.mp4")
+        assert "-sn" in args[:mp4_end]
+        assert args[mp4_end + 1 :] == [
+            "-map",
+            "0:3",
+            "-c:s",
+            "srt",
+            "-metadata:s:s:0",
+            "language=eng",
+            "-y",
+            "/media/movie.srt",
+        ]
+
+    def test_repack_skips_bitmap_subtitle_output(self):
+        """Test a bitmap subtitle stream does not add an SRT output to the repack"""
+        sub_stream = FfmpegStream(
+            index=3, type="subtitle", codec="hdmv_pgs_subtitle", language="eng"
+        )
+        with (
+            patch.object(Ffmpeg, "_needs_audio_transcode", return_value=False),
+            patch.object(Ffmpeg, "_run") as mock_run,
+        ):
+            Ffmpeg.repack_to_mp4(
+                Path("/media/movie.mkv"),
+                Path("/media/movie.mp4"),
+                audio_indices=[1],
+                extra_args=["-c:v", "copy"],
+                subtitle_stream=sub_stream,
+                subtitle_output=Path("/media/movie.srt"),
+            )
+
+        args = [str(a) for a in mock_run.call_args[0]]
+        assert args[-1] == "/media/movie.mp4"
+        assert "/media/movie.srt" not in args
+
+
+class TestFfmpegMediaInfoParse:
+    """Test parsing of ffmpeg -i output"""
+
+    OUTPUT = """\
+Input #0, matroska,webm, from '/media/movie.mkv':
+  Metadata:
+    title           : The Movie
+    comment         : burned-subs-lang:eng
+  Duration: 00:42:00.50, start: 0.000000, bitrate: 4000 kb/s
+  Stream #0:0(eng): Video: h264 (High), yuv420p, 1920x1080
+  Stream #0:1(rus): Audio: aac (LC), 48000 Hz, stereo
+    Metadata:
+      title           : Dub
+"""
+
+    def test_parse_header_and_streams(self):
+        """Test title, duration, bitrate, comment and stream titles are parsed"""
+        info = FfmpegMediaInfo.parse(self.OUTPUT, Path("/media/movie.mkv"))
+
+        assert info.title == "The Movie"
+        assert info.bitrate == "4000 kb/s"
+        assert info.duration is not None and info.duration.total_seconds() == 2520.5
+        assert info.get_burned_subtitles_lang() == "eng"
+        assert [(s.type, s.codec, s.language) for s in info.streams] == [
+            ("video", "h264", "eng"),
+            ("audio", "aac", "rus"),
+        ]
+        assert info.streams[0].title == "movie"
+        assert info.streams[1].title == "Dub"
+
+    def test_to_dict_matches_asdict(self):
+        """Test the JSON dict keeps the asdict layout with string path and duration"""
+        info = FfmpegMediaInfo.parse(self.OUTPUT, Path("/media/movie.mkv"))
+
+        expected = dataclasses.asdict(info)
+        expected["filename"] = info.filename.as_posix()
+        expected["duration"] = str(info.duration)
+        assert info.to_dict() == expected
+        assert list(info.to_dict()) == list(expected)
@@ -1,6 +1,11 @@
+import codecs
+import datetime as dt
+import errno
 import json
+import subprocess
+import sys
 from pathlib import Path
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -15,8 +20,11 @@ class TestUtilityFunctions:
     def test_bb_bold_formatting(self, mock_typer_style):
         """Test bb function calls typer.style with bold=True"""
         mock_typer_style.return_value = "styled_text"
+        bb.cache_clear()
 
         result = bb("test text")
+        bb("test text")
+        bb.cache_clear()
 
         mock_typer_style.assert_called_once_with("test text", bold=True)
         assert result == "styled_text"
@@ -122,6 +130,16 @@ class TestUtilityFunctions:
             assert "/test/pwd" in str(result)
             assert "relative/path" in str(result)
 
+    def test_resolve_path_pwd_normalizes_without_resolving(self, tmp_path, monkeypatch):
+        """Test '..' is collapsed lexically and a symlinked PWD is kept as is"""
+        (tmp_path / "real").mkdir()
+        (tmp_path / "link").symlink_to(tmp_path / "real")
+        monkeypatch.setenv("PWD", str(tmp_path / "link"))
+
+        result = utils.resolve_path_pwd(Path("sub/../movie.mkv"))
+
+        assert result == tmp_path / "link" / "movie.mkv"
+
     def test_get_file_path_with_language(self):
         """Test get_file_path function with language parameter"""
         media_path = Path("/media/video.mkv")
@@ -143,35 +161,45 @@ class TestUtilityFunctions:
         assert "en" in result.stem  # Should be truncated from "english" to "en"
         assert "english" not in result.stem  # Full language should not be there
 
-    def test_move_file_success(self):
+    def test_move_file_success(self, tmp_path):
         """Test successful file move"""
-        with (
-            patch("shutil.move") as mock_move,
-            patch.object(Path, "is_file", return_value=True),
-            patch.object(Path, "exists", return_value=False),
-        ):
-            source = Path("/source/file.txt")
-            dest = Path("/dest/file.txt")
+        source = tmp_path / "file.txt"
+        source.write_text("data")
+        dest = tmp_path / "dest"
+        dest.mkdir()
 
-            utils.move_file(source, dest)
+        utils.move_file(source, dest)
 
-            mock_move.assert_called_once_with(source, dest)
+        assert not source.exists()
+        assert (dest / "file.txt").read_text() == "data"
 
-    def test_move_file_with_overwrite(self):
+    def test_move_file_with_overwrite(self, tmp_path):
         """Test file move with overwrite when destination exists"""
+        source = tmp_path / "new.txt"
+        source.write_text("new")
+        dest = tmp_path / "old.txt"
+        dest.write_text("old")
+
+        with pytest.raises(FileExistsError):
+            utils.move_file(source, dest)
+        utils.move_file(source, dest, overwrite=True)
+
+        assert not source.exists()
+        assert dest.read_text() == "new"
+
+    def test_move_file_across_filesystems(self, tmp_path):
+        """Test rename failing with EXDEV falls back to shutil.move"""
+        source = tmp_path / "file.txt"
+        source.write_text("data")
+        dest = tmp_path / "moved.txt"
+
         with (
+            patch("os.replace", side_effect=OSError(errno.EXDEV, "cross-device")),
             patch("shutil.move") as mock_move,
-            patch.object(Path, "is_file", return_value=True),
-            patch.object(Path, "exists", return_value=True),
-            patch.object(Path, "unlink") as mock_unlink,
         ):
-            source = Path("/source/file.txt")
-            dest = Path("/dest/file.txt")
-
-            utils.move_file(source, dest, overwrite=True)
+            utils.move_file(source, dest)
 
-            mock_unlink.assert_called_once()
-            mock_move.assert_called_once_with(source, dest)
+        mock_move.assert_called_once_with(source, dest)
 
     def test_move_file_not_a_file(self):
         """Test move_file raises error when source is not a file"""
@@ -182,6 +210,178 @@ class TestUtilityFunctions:
             with pytest.raises(ValueError, match="Source is not a file"):
                 utils.move_file(source, dest)
 
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_json_loads(self, use_orjson):
+        """Test json_loads parses bytes with and without orjson"""
+        if use_orjson:
+            pytest.importorskip("orjson")
+        with patch.object(utils, "orjson", utils.orjson if use_orjson else None):
+            assert utils.json_loads(b'{"a": [1, "\\u00e9"]}') == {"a": [1, "\u00e9"]}
+
+    def test_run_process_live_output_splits_progress(self):
+        """Test live output splits carriage-return progress into lines"""
+        script = "import sys; sys.stdout.write('frame=1\\rframe=2\\rdone\\n')"
+
+        with patch.object(utils.echo, "print") as mock_print:
+            result = utils.run_process([sys.executable, "-c", script], live_output=True)
+
+        assert result.stdout == "frame=1\nframe=2\ndone\n"
+        assert mock_print.call_count == 3
+
+    @pytest.mark.parametrize(
+        ("text", "encoding", "expected"),
+        [
+            ("Привет, как дела? Всё хорошо.\n" * 20, "utf-8", "utf-8"),
+            ("Привет, как дела? Всё хорошо.\n" * 20, "cp1251", "cp1251"),
+        ],
+    )
+    def test_detect_encoding(self, tmp_path, text, encoding, expected):
+        """Test detected encodings are returned as canonical codec names"""
+        path = tmp_path / "subs.srt"
+        path.write_bytes(text.encode(encoding))
+
+        assert utils.detect_encoding(path) == expected
+
+    def test_detect_encoding_stops_on_bom(self, tmp_path):
+        """Test a BOM settles detection without reading the rest of the file"""
+        path = tmp_path / "subs.srt"
+        path.write_bytes(codecs.BOM_UTF8 + b"x" * (3 * utils._DETECT_CHUNK_SIZE))
+        detector_cls = utils._chardet().UniversalDetector
+        feed = detector_cls.feed
+
+        with patch.object(detector_cls, "feed", autospec=True, side_effect=feed) as mock:
+            assert utils.detect_encoding(path) == "utf-8-sig"
+
+        assert mock.call_count == 1
+
+    @pytest.mark.parametrize(
+        "content", [b"1\n00:00:01,000 --> Hello\n", "Привет".encode()]
+    )
+    def test_detect_encoding_utf8_skips_detector(self, tmp_path, content):
+        """Test ASCII and valid UTF-8 files are reported as utf-8 without chardet"""
+        path = tmp_path / "subs.srt"
+        path.write_bytes(content)
+
+        with patch.object(utils._chardet(), "UniversalDetector") as mock_detector:
+            assert utils.detect_encoding(path) == "utf-8"
+
+        mock_detector.return_value.feed.assert_not_called()
+
+    def test_detect_encoding_cchardet_detector(self, tmp_path):
+        """Test a cchardet-style detector whose close() returns None is supported"""
+
+        class CchardetDetector:
+            done = False
+            result = {"encoding": None, "confidence": None}
+
+            def feed(self, data):
+                self.done = True
+
+            def close(self):
+                self.result = {"encoding": "WINDOWS-1251", "confidence": 0.99}
+
+        path = tmp_path / "subs.srt"
+        path.write_bytes("Привет\n".encode("cp1251") * 50)
+        fake_module = MagicMock(UniversalDetector=CchardetDetector)
+
+        with patch.object(utils, "_chardet", return_value=fake_module):
+            assert utils.detect_encoding(path) == "cp1251"
+
+    def test_detect_encoding_cached_until_rewrite(self, tmp_path):
+        """Test an unchanged file is detected once, a rewritten one again"""
+        path = tmp_path / "subs.srt"
+        path.write_bytes("Привет\n".encode("cp1251") * 50)
+        detector_cls = utils._chardet().UniversalDetector
+        close = detector_cls.close
+
+        with patch.object(
+            detector_cls, "close", autospec=True, side_effect=close
+        ) as mock:
+            utils.detect_encoding(path)
+            utils.detect_encoding(path)
+            assert mock.call_count == 1
+
+            path.write_bytes("Привет, мир\n".encode("cp1251") * 50)
+            utils.detect_encoding(path)
+            assert mock.call_count == 2
+
+    @pytest.mark.parametrize(
+        ("size", "expected"),
+        [
+            (0, "0.0B"),
+            (1023, "1023.0B"),
+            (1024, "1.0KB"),
+            (1536, "1.5KB"),
+            (4.3 * 1024**3, "4.3GB"),
+            (2 * 1024**6, "2048.0PB"),
+        ],
+    )
+    def test_format_size(self, size, expected):
+        """Test sizes are scaled to the largest unit below 1024"""
+        assert utils.format_size(size) == expected
+
+    @pytest.mark.parametrize(
+        ("duration", "expected"),
+        [
+            (
+                "01:42:18.05",
+                dt.timedelta(hours=1, minutes=42, seconds=18, milliseconds=50),
+            ),
+            ("00:00:01.5", dt.timedelta(seconds=1, milliseconds=500)),
+            ("00:10:00", dt.timedelta(minutes=10)),
+        ],
+    )
+    def test_parse_duration(self, duration, expected):
+        """Test ffmpeg durations, the fraction being part of a second"""
+        assert utils.parse_duration(duration) == expected
+
+    def test_parse_duration_invalid(self):
+        """Test malformed durations are rejected"""
+        with pytest.raises(ValueError, match="Invalid duration"):
+            utils.parse_duration("N/A")
+
+    def test_get_temp_file(self, tmp_path, monkeypatch):
+        """Test temp files are created in cwd, or only named when create=False"""
+        monkeypatch.chdir(tmp_path)
+
+        created = utils.get_temp_file(suffix=".srt")
+        named = utils.get_temp_file(suffix=".srt", create=False)
+
+        assert created.is_file() and created.parent == tmp_path
+        assert not named.exists() and named.parent == tmp_path
+        assert created.name.startswith(".tmp") and named.name.endswith(".srt")
+
+    @patch("typer.prompt", return_value="secret ")
+    def test_sudo_password_asked_once(self, mock_typer_prompt):
+        """Test the sudo password is prompted once and reused for later commands"""
+        utils._get_sudo_password.cache_clear()
+        with patch.object(utils.echo, "print"):
+            first = utils.get_sudo_pass(["sudo", "-S", "mkdir"], what_happens="mkdir")
+            second = utils.get_sudo_pass(["sudo", "-S", "mv"], what_happens="mv")
+        utils._get_sudo_password.cache_clear()
+
+        assert first == second == "secret"
+        mock_typer_prompt.assert_called_once()
+
+    @patch("typer.prompt", side_effect=["wrong", "secret"])
+    def test_sudo_password_asked_again_after_failure(self, mock_typer_prompt):
+        """Test a failed sudo command forgets the password so the next one re-prompts"""
+        utils._get_sudo_password.cache_clear()
+        failed = subprocess.CompletedProcess(args=[], returncode=1, stdout="")
+        ok = subprocess.CompletedProcess(args=[], returncode=0, stdout="")
+        with (
+            patch.object(utils.echo, "print"),
+            patch.object(utils, "run_process", side_effect=[failed, ok, ok]) as mock_run,
+        ):
+            utils.run_sudo(["sudo", "-S", "rm"], "rm", exit_on_error=False)
+            utils.run_sudo(["sudo", "-S", "rm"], "rm")
+            utils.run_sudo(["sudo", "-S", "mv"], "mv")
+        utils._get_sudo_password.cache_clear()
+
+        assert mock_typer_prompt.call_count == 2
+        inputs = [call.kwargs["input_"] for call in mock_run.call_args_list]
+        assert inputs == ["wrong", "secret", "secret"]
+
     @patch("typer.prompt")
     def test_select_options_interactive(self, mock_typer_prompt):
         """Test interactive option selection"""
@@ -196,6 +396,14 @@ class TestUtilityFunctions:
         assert selected == "Option 2"
         mock_typer_prompt.assert_called_once()
 
+    @patch("typer.prompt", return_value="3, 1,3,x,9")
+    def test_select_multi_options_dedupes_in_order(self, mock_typer_prompt):
+        """Test repeats and out-of-range entries are dropped, input order kept"""
+        with patch.object(utils.echo, "print"):
+            selected = utils.select_multi_options(["a", "b", "c"], option_name="Test")
+
+        assert selected == [2, 0]
+
     @patch("typer.prompt")
     def test_select_options_interactive_default_selection(self, mock_typer_prompt):
         """Test interactive selection with default (first option)"""
@@ -223,7 +431,10 @@ class TestConfig:
 
         with (
             patch("pathlib.Path.exists", return_value=True),
-            patch("builtins.open", mock_open(read_data=json.dumps(mock_config_data))),
+            patch(
+                "pathlib.Path.read_bytes",
+                return_value=json.dumps(mock_config_data).encode(),
+            ),
         ):
             config = utils.Config.load()
 
@@ -240,20 +451,19 @@ class TestConfig:
             assert config is not None
             assert config.nginx_secret is None
 
-    def test_config_save(self):
+    def test_config_save(self, tmp_path):
         """Test saving configuration to file"""
         config = utils.Config()
         config.nginx_secret = "test_secret"
         config.media_dir = Path("/test/media")
+        path = tmp_path / "browser_stream" / "config.json"
 
-        with (
-            patch("builtins.open", mock_open()) as mock_file,
-            patch("pathlib.Path.mkdir") as mock_mkdir,
-        ):
-            config.save()
+        config.save(path)
 
-            mock_mkdir.assert_called_once()
-            mock_file.assert_called_once()
+        saved = json.loads(path.read_text())
+        assert saved["nginx_secret"] == "test_secret"
+        assert saved["media_dir"] == "/test/media"
+        assert path.read_text().startswith('{\n    "media_dir"')
 
     def test_config_to_dict(self):
         """Test converting config to dictionary"""